@@ -0,0 +1,125 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional
+
+import motor
+from bson.decimal128 import Decimal128
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+import mongo
+from backends import MONGO_DB_NAME, Backend, async_performance_test, pool, register_backend
+from dataset import load_dataset
+
+
+@asynccontextmanager
+async def motor_database(concurrency: int) -> AsyncIterator[AsyncIOMotorDatabase]:
+    motor_client = AsyncIOMotorClient(pool.mongo_url(), maxPoolSize=max(concurrency, 1))
+    try:
+        yield motor_client[MONGO_DB_NAME]
+    finally:
+        motor_client.close()
+
+
+register_backend(Backend(
+    name='mongo-motor',
+    session=pool.mongo,
+    metadata=lambda mongo_db: {'server_version': mongo_db.client.server_info()['version'], 'motor': motor.version},
+    async_connect=motor_database,
+))
+
+
+def async_mongo_performance_test(init_func: Optional[Callable] = None, schema: Optional[Callable] = None,
+                                 setup_func: Optional[Callable] = None):
+    """
+    Like `mongo.mongo_performance_test`, but awaits the decorated coroutine with a Motor database.
+
+    `init_func` and `setup_func` are synchronous loaders from mongo.py, the decorated function receives the
+    Motor database.
+    """
+    return async_performance_test('mongo-motor', init_func, schema, setup_func)
+
+
+async def insert_fake_data(mongo_db: AsyncIOMotorDatabase, n: int) -> None:
+    data = load_dataset(n)
+    for artist_name, album_name, playlist_name, song_title, song_length, song_rating, yt_link in data.rows(
+            n, 'artist_name', 'album_name', 'playlist_name', 'song_title', 'song_length', 'song_rating',
+            'song_yt_link'):
+        artist_id = (await mongo_db.artists.insert_one({"name": artist_name})).inserted_id
+        album_id = (await mongo_db.albums.insert_one({"name": album_name})).inserted_id
+        song_id = (await mongo_db.songs.insert_one({
+            "title": song_title,
+            "length": mongo.to_decimal128(song_length, 2),
+            "rating": mongo.to_decimal128(song_rating, 1),
+            "yt_link": yt_link,
+            "artist_id": artist_id,
+            "album_id": album_id
+        })).inserted_id
+        playlist_id = (await mongo_db.playlists.insert_one({"name": playlist_name})).inserted_id
+        await mongo_db.artists_albums.insert_one({
+            "artist_id": artist_id,
+            "album_id": album_id
+        })
+        await mongo_db.songs_playlists.insert_one({
+            "song_id": song_id,
+            "playlist_id": playlist_id
+        })
+
+
+async def insert_many_fake_data(mongo_db: AsyncIOMotorDatabase, n: int) -> None:
+    data = load_dataset(n)
+    artists = (await mongo_db.artists.insert_many(
+        [{"name": name} for name in data.column(n, 'artist_name')])).inserted_ids
+    albums = (await mongo_db.albums.insert_many(
+        [{"name": name} for name in data.column(n, 'album_name')])).inserted_ids
+    playlists = (await mongo_db.playlists.insert_many(
+        [{"name": name} for name in data.column(n, 'playlist_name')])).inserted_ids
+    songs = (await mongo_db.songs.insert_many([
+        {
+            "title": title,
+            "length": mongo.to_decimal128(length, 2),
+            "rating": mongo.to_decimal128(rating, 1),
+            "yt_link": yt_link,
+            "artist_id": artists[artist],
+            "album_id": albums[album],
+        }
+        for title, length, rating, yt_link, artist, album in data.rows(
+            n, 'song_title', 'song_length', 'song_rating', 'song_yt_link', 'song_artist', 'song_album')
+    ])).inserted_ids
+    await mongo_db.artists_albums.insert_many([
+        {"artist_id": artists[artist], "album_id": albums[album]}
+        for album, artist in data.rows(n, 'album_artist_album', 'album_artist_artist')
+    ])
+    await mongo_db.songs_playlists.insert_many([
+        {"song_id": songs[song], "playlist_id": playlists[playlist]}
+        for playlist, song in data.rows(n, 'playlist_song_playlist', 'playlist_song_song')
+    ])
+
+
+@async_mongo_performance_test()
+async def test_insert_performance(mongo_db: AsyncIOMotorDatabase, n: int) -> None:
+    await insert_fake_data(mongo_db, n)
+
+
+@async_mongo_performance_test()
+async def test_insert_many_performance(mongo_db: AsyncIOMotorDatabase, n: int) -> None:
+    await insert_many_fake_data(mongo_db, n)
+
+
+@async_mongo_performance_test(init_func=mongo.insert_many_fake_data)
+async def test_read_performance(mongo_db: AsyncIOMotorDatabase) -> None:
+    _ = await mongo_db.songs.aggregate(mongo.SONGS_IN_A_PLAYLIST_PIPELINE).to_list(length=None)
+
+
+@async_mongo_performance_test(setup_func=mongo.reseed_fake_data)
+async def test_delete_performance(mongo_db: AsyncIOMotorDatabase) -> None:
+    await mongo_db.artists.delete_many({})
+    await mongo_db.albums.delete_many({})
+    await mongo_db.playlists.delete_many({})
+    await mongo_db.songs.delete_many({})
+    await mongo_db.artists_albums.delete_many({})
+    await mongo_db.songs_playlists.delete_many({})
+
+
+@async_mongo_performance_test(setup_func=mongo.reseed_fake_data)
+async def test_update_performance(mongo_db: AsyncIOMotorDatabase) -> None:
+    await mongo_db.artists.update_many({}, {"$set": {"name": "Updated Artist Name"}})
+    await mongo_db.songs.update_many({}, {"$set": {"length": Decimal128("3.50")}})
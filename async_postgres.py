@@ -0,0 +1,115 @@
+import random
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from typing import AsyncIterator, Callable, Optional
+
+import asyncpg
+
+import postgres
+from backends import Backend, async_performance_test, pool, register_backend
+from dataset import DEFAULT_SEED, load_dataset
+
+
+@asynccontextmanager
+async def asyncpg_pool(concurrency: int) -> AsyncIterator[asyncpg.Pool]:
+    pg_pool = await asyncpg.create_pool(pool.postgres_url(), min_size=concurrency, max_size=concurrency)
+    try:
+        yield pg_pool
+    finally:
+        await pg_pool.close()
+
+
+register_backend(Backend(
+    name='postgres-asyncpg',
+    session=pool.postgres,
+    default_schema=postgres.create_postgres_schema,
+    metadata=lambda connection: {'server_version': connection.server_version, 'asyncpg': asyncpg.__version__},
+    async_connect=asyncpg_pool,
+))
+
+
+def async_postgres_performance_test(init_func: Optional[Callable] = None, schema: Optional[Callable] = None,
+                                    setup_func: Optional[Callable] = None):
+    """
+    Like `postgres.postgres_performance_test`, but awaits the decorated coroutine through an asyncpg pool.
+
+    `init_func` and `setup_func` are synchronous loaders from postgres.py, the decorated function receives the
+    asyncpg pool.
+    """
+    return async_performance_test('postgres-asyncpg', init_func, schema, setup_func)
+
+
+async def insert_fake_data(pg_pool: asyncpg.Pool, n: int, seed: int = DEFAULT_SEED) -> None:
+    rng = random.Random(seed)
+    data = load_dataset(n)
+    artist_ids, album_ids, playlist_ids, song_ids = [], [], [], []
+    async with pg_pool.acquire() as connection:
+        async with connection.transaction():
+            for artist_name, album_name, playlist_name, song_title, song_length, song_rating, yt_link in data.rows(
+                    n, 'artist_name', 'album_name', 'playlist_name', 'song_title', 'song_length', 'song_rating',
+                    'song_yt_link'):
+                artist_ids.append(await connection.fetchval(
+                    "INSERT INTO A_Artists (A_Name) VALUES ($1) RETURNING A_ID", artist_name))
+                album_ids.append(await connection.fetchval(
+                    "INSERT INTO Al_Albums (Al_Name) VALUES ($1) RETURNING Al_ID", album_name))
+                playlist_ids.append(await connection.fetchval(
+                    "INSERT INTO P_Playlists (P_Name) VALUES ($1) RETURNING P_ID", playlist_name))
+                song_ids.append(await connection.fetchval(
+                    """INSERT INTO S_Songs (S_Title, S_Length, S_Rating, S_YT_Link, S_Al_ID)
+                    VALUES ($1, $2, $3, $4, $5) RETURNING S_ID
+                    """, song_title, Decimal(f"{song_length:.2f}"), Decimal(f"{song_rating:.1f}"), yt_link,
+                    rng.choice(album_ids)))
+                await connection.execute("INSERT INTO Al_Albums_have_A_Artists (Al_ID, A_ID) VALUES ($1, $2)",
+                                         rng.choice(album_ids), rng.choice(artist_ids))
+                await connection.execute("INSERT INTO P_Playlists_have_S_Songs (P_ID, S_ID) VALUES ($1, $2)",
+                                         rng.choice(playlist_ids), rng.choice(song_ids))
+
+
+async def insert_many_fake_data(pg_pool: asyncpg.Pool, n: int) -> None:
+    async with pg_pool.acquire() as connection:
+        async with connection.transaction():
+            for table, rows in postgres.generate_fake_rows(n).items():
+                if table == "S_Songs":
+                    rows = (
+                        (title, Decimal(f"{length:.2f}"), Decimal(f"{rating:.1f}"), yt_link, album)
+                        for title, length, rating, yt_link, album in rows
+                    )
+                await connection.copy_records_to_table(
+                    table.lower(), records=rows, columns=[column.lower() for column in postgres.TABLE_COLUMNS[table]]
+                )
+
+
+@async_postgres_performance_test(init_func=postgres.insert_many_fake_data)
+async def test_read_performance(pg_pool: asyncpg.Pool) -> None:
+    async with pg_pool.acquire() as connection:
+        _ = await connection.fetch("SELECT * FROM SongsInAPlaylist")
+
+
+@async_postgres_performance_test()
+async def test_insert_performance(pg_pool: asyncpg.Pool, n: int) -> None:
+    await insert_fake_data(pg_pool, n)
+
+
+@async_postgres_performance_test()
+async def test_insert_many_performance(pg_pool: asyncpg.Pool, n: int) -> None:
+    await insert_many_fake_data(pg_pool, n)
+
+
+@async_postgres_performance_test(setup_func=postgres.reseed_fake_data)
+async def test_delete_performance(pg_pool: asyncpg.Pool) -> None:
+    async with pg_pool.acquire() as connection:
+        async with connection.transaction():
+            await connection.execute("DELETE FROM P_Playlists_have_S_Songs;")
+            await connection.execute("DELETE FROM S_Songs;")
+            await connection.execute("DELETE FROM Al_Albums_have_A_Artists;")
+            await connection.execute("DELETE FROM P_Playlists;")
+            await connection.execute("DELETE FROM Al_Albums;")
+            await connection.execute("DELETE FROM A_Artists;")
+
+
+@async_postgres_performance_test(setup_func=postgres.reseed_fake_data)
+async def test_update_performance(pg_pool: asyncpg.Pool) -> None:
+    async with pg_pool.acquire() as connection:
+        async with connection.transaction():
+            await connection.execute("UPDATE A_Artists SET A_Name = 'Updated Artist Name';")
+            await connection.execute("UPDATE S_Songs SET S_Length = 3.50;")
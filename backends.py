@@ -0,0 +1,276 @@
+import asyncio
+import atexit
+import functools
+import time
+from contextlib import AbstractAsyncContextManager, AbstractContextManager, contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+
+import psycopg2
+import pymongo
+from psycopg2.extensions import connection as PgConnection
+from pymongo.database import Database
+from testcontainers.mongodb import MongoDbContainer
+from testcontainers.postgres import PostgresContainer
+
+from load_test import LoadResult, measure_load
+from performance_test import measure_performance, measure_performance_async
+from resources import ResourceProbe
+from results_store import record_result
+from streaming_test import StreamingResult, measure_streaming
+
+MONGO_DB_NAME: str = "DBIMusicPlayer"
+
+
+def _schema_key(schema: Optional[Callable]):
+    if isinstance(schema, functools.partial):
+        return schema.func, schema.args, tuple(sorted(schema.keywords.items()))
+    return schema
+
+
+def describe_schema(schema: Optional[Callable]) -> Optional[str]:
+    """Readable name of a schema callable, including the arguments bound with functools.partial."""
+    if schema is None:
+        return None
+    if isinstance(schema, functools.partial):
+        arguments = [repr(arg) for arg in schema.args] + [f"{key}={value!r}" for key, value in schema.keywords.items()]
+        return f"{schema.func.__name__}({', '.join(arguments)})"
+    return schema.__name__
+
+
+class BackendPool:
+    """
+    Keeps one warm container per backend for the whole session and resets its state between tests.
+
+    Containers are started lazily on first use and stopped at interpreter exit. Container startup and
+    state resets happen before `measure_performance` is called, their durations are kept in
+    `startup_timings` and `reset_timings` so they can be reported separately.
+
+    `container_kwargs` are passed on to `docker run` for containers started afterwards, e.g.
+    `{'cpuset_cpus': '2,3'}` to pin them to CPUs of their own (see `orchestrator.py`).
+    """
+
+    def __init__(self):
+        self._postgres: Optional[PostgresContainer] = None
+        self._postgres_schema_key = None
+        self._mongo: Optional[MongoDbContainer] = None
+        self.container_kwargs: dict = {}
+        self.startup_timings: dict[str, float] = {}
+        self.reset_timings: dict[str, list[float]] = {'postgres': [], 'mongo': []}
+        atexit.register(self.stop)
+
+    def postgres_url(self) -> str:
+        if self._postgres is None:
+            start = time.perf_counter()
+            # pg_stat_statements feeds the per-statement counters of `postgres.postgres_server_counters`.
+            self._postgres = PostgresContainer("postgres:latest").with_command(
+                "postgres -c shared_preload_libraries=pg_stat_statements"
+            )
+            if self.container_kwargs:
+                self._postgres.with_kwargs(**self.container_kwargs)
+            self._postgres.start()
+            self.startup_timings['postgres'] = time.perf_counter() - start
+            print(f"Started postgres container in {self.startup_timings['postgres']:.2f} s")
+        return self._postgres.get_connection_url().replace('postgresql+psycopg2://', 'postgresql://')
+
+    def mongo_url(self) -> str:
+        if self._mongo is None:
+            start = time.perf_counter()
+            self._mongo = MongoDbContainer()
+            if self.container_kwargs:
+                self._mongo.with_kwargs(**self.container_kwargs)
+            self._mongo.start()
+            self.startup_timings['mongo'] = time.perf_counter() - start
+            print(f"Started mongo container in {self.startup_timings['mongo']:.2f} s")
+        return self._mongo.get_connection_url()
+
+    @contextmanager
+    def postgres(self, schema: Callable[[PgConnection], None]) -> Iterator[PgConnection]:
+        """Yields a connection to an empty database with `schema` applied."""
+        with self.connect_postgres() as connection:
+            self._reset_postgres(connection, schema)
+            yield connection
+
+    @contextmanager
+    def mongo(self, schema: Optional[Callable[[Database], None]] = None, db_name: str = MONGO_DB_NAME) -> Iterator[Database]:
+        """Yields an empty database with `schema` (e.g. index creation) applied."""
+        with self.connect_mongo(db_name) as db:
+            self._reset_mongo(db, schema)
+            yield db
+
+    @contextmanager
+    def connect_postgres(self) -> Iterator[PgConnection]:
+        """Yields an additional connection to the current database without resetting it."""
+        connection = psycopg2.connect(self.postgres_url())
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def connect_mongo(self, db_name: str = MONGO_DB_NAME) -> Iterator[Database]:
+        """Yields the current database through a dedicated client without resetting it."""
+        mongo_client = pymongo.MongoClient(self.mongo_url())
+        try:
+            yield mongo_client[db_name]
+        finally:
+            mongo_client.close()
+
+    def _reset_postgres(self, connection: PgConnection, schema: Callable[[PgConnection], None]) -> None:
+        start = time.perf_counter()
+        key = _schema_key(schema)
+        with connection.cursor() as cursor:
+            if key == self._postgres_schema_key:
+                # Same schema as the previous test: only the data has to go.
+                cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public'")
+                tables = [table for table, in cursor.fetchall()]
+                if tables:
+                    cursor.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+                # Materialized views are not truncated with their base tables.
+                cursor.execute("SELECT matviewname FROM pg_matviews WHERE schemaname = 'public'")
+                for view, in cursor.fetchall():
+                    cursor.execute(f"REFRESH MATERIALIZED VIEW {view}")
+            else:
+                cursor.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+        connection.commit()
+        if key != self._postgres_schema_key:
+            schema(connection)
+            self._postgres_schema_key = key
+        self._record_reset('postgres', time.perf_counter() - start)
+
+    def _reset_mongo(self, db: Database, schema: Optional[Callable[[Database], None]]) -> None:
+        start = time.perf_counter()
+        db.client.drop_database(db.name)
+        if schema:
+            schema(db)
+        self._record_reset('mongo', time.perf_counter() - start)
+
+    def _record_reset(self, backend: str, seconds: float) -> None:
+        self.reset_timings[backend].append(seconds)
+        print(f"Reset {backend} state in {seconds:.4f} s")
+
+    def stop(self) -> None:
+        if self._postgres is not None:
+            self._postgres.stop()
+            self._postgres = None
+            self._postgres_schema_key = None
+        if self._mongo is not None:
+            self._mongo.stop()
+            self._mongo = None
+
+
+pool: BackendPool = BackendPool()
+
+
+@dataclass
+class Backend:
+    """
+    Everything the generic test decorators need to know about one backend, see `register_backend`.
+
+    :param session: `session(schema)` yields a handle to an empty database with `schema` applied.
+    :param connect: `connect()` yields an additional handle to the current database, used by load tests.
+    :param default_schema: Schema used when neither the decorator nor the call passes one.
+    :param metadata: `metadata(db)` returns what to record with every result, e.g. the server version.
+    :param resource_probe: Collects `BenchmarkResult.resources`, see `performance_test.measure_performance`.
+    :param explain: `explain(db, query)` returns the plan of a decorator's `explain` query.
+    :param async_connect: `async_connect(concurrency)` yields the async handle for `async_performance_test`.
+    """
+    name: str
+    session: Callable[[Optional[Callable]], AbstractContextManager]
+    connect: Optional[Callable[[], AbstractContextManager]] = None
+    default_schema: Optional[Callable] = None
+    metadata: Callable[[Any], dict] = lambda db: {}
+    resource_probe: Optional[ResourceProbe] = None
+    explain: Optional[Callable[[Any, Any], dict]] = None
+    async_connect: Optional[Callable[[int], AbstractAsyncContextManager]] = None
+
+
+BACKENDS: dict[str, Backend] = {}
+
+
+def register_backend(backend: Backend) -> Backend:
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+def performance_test(backend: str, init_func: Optional[Callable] = None, schema: Optional[Callable] = None,
+                     setup_func: Optional[Callable] = None, teardown_func: Optional[Callable] = None,
+                     explain: Any = None):
+    """
+    Measures the decorated function with `measure_performance` on a fresh database of the registered `backend`.
+
+    `schema` and `backend` can also be overridden per call, e.g.
+    `schema=functools.partial(create_postgres_schema, index_set=...)` or `backend='duckdb'` for backends that
+    share their tests. Pass `instrument=False` to skip the extra call that collects `BenchmarkResult.resources`.
+
+    :param explain: Query the decorated function reads with, in the form the backend's `explain` expects. Its plan
+        is stored in `BenchmarkResult.plan` after the measurement, once per backend, data size and schema.
+    """
+    default_backend, default_schema = backend, schema
+    explained: set[tuple] = set()
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, n_tests: int = 10, schema: Optional[Callable] = default_schema,
+                    backend: str = default_backend, instrument: bool = True, **kwargs):
+            registered = BACKENDS[backend]
+            schema = schema or registered.default_schema
+            with registered.session(schema) as db:
+                result = measure_performance(db=db, test_func=func, n_tests=n_tests, init_func=init_func, *args,
+                                             setup_func=setup_func, teardown_func=teardown_func,
+                                             resource_probe=registered.resource_probe if instrument else None,
+                                             **kwargs)
+                result.params['schema'] = describe_schema(schema)
+                key = (backend, result.n, result.params['schema'])
+                if explain is not None and registered.explain and key not in explained:
+                    result.plan = registered.explain(db, explain)
+                    explained.add(key)
+                return record_result(result, registered.name, **registered.metadata(db))
+
+        return wrapper
+
+    return decorator
+
+
+def async_performance_test(backend: str, init_func: Optional[Callable] = None, schema: Optional[Callable] = None,
+                           setup_func: Optional[Callable] = None):
+    """
+    Like `performance_test`, but awaits the decorated coroutine with the handle of the backend's `async_connect`.
+
+    `init_func` and `setup_func` are synchronous loaders that seed through the handle of `session`.
+    """
+    default_schema = schema
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, n_tests: int = 10, concurrency: int = 1, schema: Optional[Callable] = default_schema,
+                    **kwargs):
+            registered = BACKENDS[backend]
+            schema = schema or registered.default_schema
+            with registered.session(schema) as db:
+                result = asyncio.run(measure_performance_async(
+                    db, functools.partial(registered.async_connect, concurrency), func, n_tests, init_func,
+                    concurrency, *args, setup_func=setup_func, **kwargs
+                ))
+                result.params['schema'] = describe_schema(schema)
+                return record_result(result, registered.name, **registered.metadata(db))
+
+        return wrapper
+
+    return decorator
+
+
+def load_test(backend: str, test_func: Callable, init_func: Optional[Callable] = None,
+              schema: Optional[Callable] = None, **kwargs) -> list[LoadResult]:
+    """Runs `test_func` with 1..64 concurrent clients, each on its own `connect()` handle, see `measure_load`."""
+    registered = BACKENDS[backend]
+    with registered.session(schema or registered.default_schema) as db:
+        return measure_load(db, registered.connect, test_func, init_func, **kwargs)
+
+
+def streaming_test(backend: str, stream_func: Callable, init_func: Optional[Callable] = None,
+                   schema: Optional[Callable] = None, **kwargs) -> list[StreamingResult]:
+    """Streams the result of `stream_func` at every batch size, see `streaming_test.measure_streaming`."""
+    registered = BACKENDS[backend]
+    with registered.session(schema or registered.default_schema) as db:
+        return measure_streaming(db, stream_func, init_func, **kwargs)
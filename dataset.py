@@ -0,0 +1,178 @@
+import functools
+import json
+import shutil
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+import numpy as np
+from faker import Faker
+from tqdm import tqdm
+
+DATASET_DIR: Path = Path(__file__).parent / 'datasets'
+DEFAULT_SEED: int = 42
+CHUNK_SIZE: int = 65_536
+
+STRING_COLUMNS: tuple[str, ...] = (
+    'artist_name', 'album_name', 'playlist_name', 'song_title', 'song_yt_link',
+)
+NUMERIC_COLUMNS: dict[str, str] = {
+    'song_length': 'float64',
+    'song_rating': 'float64',
+    # Foreign keys are 0-based row indices into the referenced column.
+    'song_artist': 'int64',
+    'song_album': 'int64',
+    'album_artist_album': 'int64',
+    'album_artist_artist': 'int64',
+    'playlist_song_playlist': 'int64',
+    'playlist_song_song': 'int64',
+}
+
+
+class StringColumn:
+    """Variable-length utf-8 strings stored as one memory-mapped byte blob plus an offsets array."""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self._data[self._offsets[i]:self._offsets[i + 1]].tobytes().decode()
+
+    def chunk(self, start: int, stop: int) -> list[str]:
+        offsets = self._offsets[start:stop + 1].tolist()
+        blob = self._data[offsets[0]:offsets[-1]].tobytes()
+        base = offsets[0]
+        return [blob[a - base:b - base].decode() for a, b in zip(offsets, offsets[1:])]
+
+
+Column = Union[StringColumn, np.ndarray]
+
+
+class Dataset:
+    """
+    Read-only, memory-mapped artist/album/song/playlist corpus shared by all backends.
+
+    Rows are generated one at a time from a single seeded Faker instance, so the first `n` rows of a larger
+    dataset are identical to a dataset built with size `n`. Loaders can therefore always read a prefix.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        meta = json.loads((path / 'meta.json').read_text())
+        self.size: int = meta['size']
+        self.seed: int = meta['seed']
+        self.columns: dict[str, Column] = {}
+        for name in STRING_COLUMNS:
+            self.columns[name] = StringColumn(
+                np.memmap(path / f'{name}.bin', dtype=np.uint8, mode='r') if (path / f'{name}.bin').stat().st_size
+                else np.zeros(0, dtype=np.uint8),
+                np.load(path / f'{name}.offsets.npy', mmap_mode='r'),
+            )
+        for name in NUMERIC_COLUMNS:
+            self.columns[name] = np.load(path / f'{name}.npy', mmap_mode='r')
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, name: str) -> Column:
+        return self.columns[name]
+
+    def rows(self, n: int, *names: str) -> Iterator[tuple]:
+        """Yields the first `n` rows of the given columns as tuples of plain Python values."""
+        if n > self.size:
+            raise ValueError(f"Dataset at {self.path} has {self.size} rows, {n} requested")
+        for start in range(0, n, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, n)
+            chunks = [
+                column.chunk(start, stop) if isinstance(column, StringColumn) else column[start:stop].tolist()
+                for column in (self.columns[name] for name in names)
+            ]
+            yield from zip(*chunks)
+
+    def column(self, n: int, name: str) -> Iterator:
+        return (value for value, in self.rows(n, name))
+
+
+def _dataset_path(size: int, seed: int) -> Path:
+    return DATASET_DIR / f'seed{seed}_n{size}'
+
+
+def build_dataset(size: int, seed: int = DEFAULT_SEED) -> Path:
+    """Generates `size` rows per entity with Faker and writes them column-wise to `DATASET_DIR`."""
+    path = _dataset_path(size, seed)
+    tmp_path = path.with_name(path.name + '.tmp')
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+
+    faker = Faker()
+    faker.seed_instance(seed)
+    blobs = {name: open(tmp_path / f'{name}.bin', 'wb') for name in STRING_COLUMNS}
+    offsets = {name: np.zeros(size + 1, dtype=np.int64) for name in STRING_COLUMNS}
+    numerics = {name: np.zeros(size, dtype=dtype) for name, dtype in NUMERIC_COLUMNS.items()}
+    try:
+        print(f"Building dataset with {size} rows (seed={seed}) at {path}")
+        for i in tqdm(range(size)):
+            strings = {
+                'artist_name': faker.name(),
+                'album_name': faker.catch_phrase(),
+                'playlist_name': faker.catch_phrase(),
+                'song_title': faker.sentence(),
+                # The row index keeps links unique, so unique indexes on yt_link can be built on any prefix.
+                'song_yt_link': f"{faker.url()}watch?v={i}",
+            }
+            for name, value in strings.items():
+                encoded = value.encode()
+                blobs[name].write(encoded)
+                offsets[name][i + 1] = offsets[name][i] + len(encoded)
+            numerics['song_length'][i] = float(faker.pydecimal(left_digits=2, right_digits=2, positive=True))
+            numerics['song_rating'][i] = float(faker.pydecimal(left_digits=1, right_digits=1, positive=True))
+            for name in ('song_artist', 'song_album', 'album_artist_album', 'album_artist_artist',
+                         'playlist_song_playlist', 'playlist_song_song'):
+                numerics[name][i] = i
+    finally:
+        for blob in blobs.values():
+            blob.close()
+
+    for name in STRING_COLUMNS:
+        np.save(tmp_path / f'{name}.offsets.npy', offsets[name])
+    for name, values in numerics.items():
+        np.save(tmp_path / f'{name}.npy', values)
+    (tmp_path / 'meta.json').write_text(json.dumps({'size': size, 'seed': seed}))
+
+    shutil.rmtree(path, ignore_errors=True)
+    tmp_path.rename(path)
+    return path
+
+
+@functools.lru_cache(maxsize=None)
+def _open_dataset(path: Path) -> Dataset:
+    return Dataset(path)
+
+
+@functools.lru_cache(maxsize=None)
+def load_dataset(n: int, seed: int = DEFAULT_SEED) -> Dataset:
+    """Returns the smallest on-disk dataset with at least `n` rows for `seed`, building one if there is none."""
+    candidates = []
+    for meta in DATASET_DIR.glob(f'seed{seed}_n*/meta.json'):
+        if meta.parent.name.endswith('.tmp'):
+            continue
+        size = json.loads(meta.read_text())['size']
+        if size >= n:
+            candidates.append((size, meta.parent))
+    if candidates:
+        return _open_dataset(min(candidates)[1])
+    return _open_dataset(build_dataset(n, seed))
+
+
+def open_datasets(*sizes: Optional[int]) -> None:
+    """
+    Opens (and builds, if none is on disk yet) the datasets the loaders of a test read, before anything is timed.
+
+    The loaders then take the open `Dataset` from the `load_dataset` cache instead of paying for Faker or the memory
+    mapping in the first sample.
+    """
+    for size in sorted({size for size in sizes if isinstance(size, int) and size > 0}):
+        load_dataset(size)
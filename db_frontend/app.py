@@ -1,6 +1,14 @@
+from typing import Optional
+
 from bson import ObjectId
-from flask import Flask, render_template, request, redirect, url_for
-from pymongo import MongoClient
+from bson.errors import InvalidId
+from bson.json_util import dumps, loads
+from flask import Flask, Response, jsonify, render_template, request, redirect, stream_with_context, url_for
+from pymongo import DeleteOne, InsertOne, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from cache import QueryCache
+from playlist_view import PlaylistView, VIEW_SORT, VIEW_STAGES
 
 app = Flask(__name__)
 client = MongoClient('localhost', 27017, username='root', password='1234')
@@ -10,83 +18,319 @@ albums = db['albums']
 songs = db['songs']
 playlists = db['playlists']
 
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Documents per cursor batch of the streaming API, and so per chunk of its responses.
+STREAM_BATCH_SIZE = 500
+MAX_BULK_OPERATIONS = 10_000
+
+# Fields each table of the index page displays, everything else stays on the server.
+TABLE_FIELDS = {
+    'artists': ['name'],
+    'albums': ['name'],
+    'songs': ['title', 'length', 'rating', 'yt_link', 'artist_id', 'album_id'],
+    'playlists': ['name', 'songs'],
+}
+TABLES = [*TABLE_FIELDS, 'playlist_view']
+# Collections each table reads, a write to one of them invalidates the cached pages of the table.
+TABLE_COLLECTIONS = {table: [table] for table in TABLE_FIELDS}
+TABLE_COLLECTIONS['playlist_view'] = ['playlists', 'playlist_view']
+
+cache = QueryCache(max_entries=256, ttl=60.0)
+view = PlaylistView(db, on_change=lambda: cache.invalidate('playlist_view'))
 
-def view_query():
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "songs",
-                "localField": "songs",
-                "foreignField": "_id",
-                "as": "songs_info"
-            }
-        },
-        {
-            "$unwind": "$songs_info"
-        },
-        {
-            "$lookup": {
-                "from": "artists",
-                "localField": "songs_info.artist_id",
-                "foreignField": "_id",
-                "as": "artist_info"
-            }
-        },
-        {
-            "$unwind": "$artist_info"
-        },
-        {
-            "$lookup": {
-                "from": "albums",
-                "localField": "songs_info.album_id",
-                "foreignField": "_id",
-                "as": "album_info"
-            }
-        },
-        {
-            "$unwind": "$album_info"
-        },
-        {
-            "$project": {
-                "playlists_id": "$_id",
-                "playlists_name": "$name",
-                "songs_id": "$songs_info._id",
-                "songs_title": "$songs_info.title",
-                "songs_length": "$songs_info.length",
-                "songs_rating": "$songs_info.rating",
-                "songs_yt_link": "$songs_info.yt_link",
-                "artists_id": "$artist_info._id",
-                "artists_name": "$artist_info.name",
-                "albums_id": "$album_info._id",
-                "albums_name": "$album_info.name"
-            }
-        }
-    ]
+
+def view_query(after: Optional[ObjectId] = None, limit: Optional[int] = None):
+    """
+    Rows of the live playlist view pipeline, optionally only those of the `limit` playlists following `after`.
+
+    The index page reads the materialized `playlist_view` collection instead, see `playlist_view.PlaylistView`.
+    """
+    page = [{"$match": {"_id": {"$gt": after}}}] if after else []
+    if limit:
+        page += [{"$sort": {"_id": 1}}, {"$limit": limit}]
+    pipeline = page + VIEW_STAGES
     result = list(playlists.aggregate(pipeline))
     return result
 
 
-def add_row_numbers(result):
-    for i, row in enumerate(result):
-        row['row_number'] = i + 1
-    return result
+def add_row_numbers(result, start=0):
+    # Copies the rows, they may be shared with the cache.
+    return [{**row, 'row_number': start + i + 1} for i, row in enumerate(result)]
+
+
+def parse_page_args():
+    """`after` (the last `_id` of the previous page) and `limit` of the requested page."""
+    try:
+        after = ObjectId(request.args['after']) if request.args.get('after') else None
+    except InvalidId:
+        after = None
+    limit = min(max(request.args.get('limit', PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    return after, limit
+
+
+def load_page(table, after, limit):
+    """
+    One page of `table` in `_id` order and the `after` value of the next page (None on the last page).
+
+    Pages continue after the last `_id` of the previous one instead of skipping rows, so every page is an index
+    range scan no matter how deep it is.
+    """
+    query = {'_id': {'$gt': after}} if after else {}
+    if table == 'playlist_view':
+        # Playlists without songs have no view rows, so whether there is a next page is decided on their ids.
+        playlist_ids = [playlist['_id'] for playlist in
+                        playlists.find(query, {'_id': 1}).sort('_id', 1).limit(limit + 1)]
+        if not playlist_ids:
+            return [], None
+        next_after = playlist_ids[limit - 1] if len(playlist_ids) > limit else None
+        view.ensure_ready()
+        last_id = playlist_ids[min(limit, len(playlist_ids)) - 1]
+        rows = view.collection.find({'playlists_id': {**query.get('_id', {}), '$lte': last_id}}, {'_id': 0})
+        return list(rows.sort(VIEW_SORT)), next_after
+
+    rows = list(db[table].find(query, TABLE_FIELDS[table]).sort('_id', 1).limit(limit + 1))
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], rows[limit - 1]['_id']
+
+
+def cached_page(table, after, limit):
+    return cache.get_or_load((table, after, limit), TABLE_COLLECTIONS[table], lambda: load_page(table, after, limit))
 
 
 @app.route('/')
 def index():
-    query_result = view_query()
-    artists_result = list(artists.find())
-    albums_result = list(albums.find())
-    songs_result = list(songs.find())
-    playlists_result = list(playlists.find())
+    table = request.args.get('table', 'artists')
+    if table not in TABLES:
+        table = 'artists'
+    after, limit = parse_page_args()
+    start = request.args.get('start', 0, type=int)
+
+    rows, next_after = cached_page(table, after, limit)
+    rows = add_row_numbers(rows, start)
+
+    return render_template('index.html', table=table, rows=rows, limit=limit, next_after=next_after,
+                           next_start=start + len(rows))
+
+
+@app.route('/tables/<table>')
+def table_page(table):
+    if table not in TABLES:
+        return "Error: Unknown table", 404
+    after, limit = parse_page_args()
+    rows, next_after = cached_page(table, after, limit)
+    return Response(dumps({'rows': rows, 'next_after': next_after}), mimetype='application/json')
+
+
+def record_write(collection_name, document_id):
+    """Brings the playlist_view collection and the cached pages up to date after a write."""
+    record_writes([(collection_name, document_id)])
+
+
+def record_writes(writes):
+    """`record_write` for many (collection name, document id) writes at once."""
+    view.ensure_ready()
+    view.apply_writes(writes)
+    for collection_name in dict.fromkeys(collection_name for collection_name, _ in writes):
+        cache.invalidate(collection_name)
+
+
+def stream_cursor(table, after=None, after_song=None):
+    """
+    Cursor over the whole of `table` in index order, fetched `STREAM_BATCH_SIZE` documents at a time.
+
+    The playlist view is ordered by (playlists_id, songs_id), so it resumes after `after` and `after_song` together,
+    within the playlist it stopped in.
+    """
+    if table == 'playlist_view':
+        view.ensure_ready()
+        query = {}
+        if after and after_song:
+            query = {'$or': [{'playlists_id': {'$gt': after}},
+                             {'playlists_id': after, 'songs_id': {'$gt': after_song}}]}
+        elif after:
+            query = {'playlists_id': {'$gt': after}}
+        return view.collection.find(query, {'_id': 0}, batch_size=STREAM_BATCH_SIZE).sort(VIEW_SORT)
+    query = {'_id': {'$gt': after}} if after else {}
+    return db[table].find(query, TABLE_FIELDS[table], batch_size=STREAM_BATCH_SIZE).sort('_id', 1)
+
 
-    query_result = add_row_numbers(query_result)
-    artists_result = add_row_numbers(artists_result)
-    albums_result = add_row_numbers(albums_result)
-    songs_result = add_row_numbers(songs_result)
-    playlists_result = add_row_numbers(playlists_result)
+def batched_chunks(cursor, separator='', terminator=''):
+    """Joins the documents of each cursor batch into one chunk, with `separator` between and `terminator` after each."""
+    try:
+        chunk = []
+        first = True
+        for document in cursor:
+            chunk.append(('' if first else separator) + dumps(document) + terminator)
+            first = False
+            if len(chunk) == STREAM_BATCH_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+    finally:
+        cursor.close()
 
-    return render_template('index.html', query_result=query_result, artists_result=artists_result, albums_result=albums_result, songs_result=songs_result, playlists_result=playlists_result)
+
+def ndjson_stream(cursor):
+    return batched_chunks(cursor, terminator='\n')
+
+
+def json_array_stream(cursor):
+    # The opening bracket goes out before the first batch is fetched.
+    yield '['
+    yield from batched_chunks(cursor, separator=',')
+    yield ']'
+
+
+@app.route('/api/<table>')
+def api_export(table):
+    """
+    Streams the whole table as NDJSON (`?format=ndjson`, the default) or as one chunked JSON array (`?format=json`).
+
+    Only one cursor batch is held in memory at a time. `?after=<id>` resumes an interrupted export after the last
+    `_id` it received. For the playlist view the cursor is the `playlists_id` and `songs_id` of the last row
+    received, passed as `?after=<playlists_id>&after_song=<songs_id>`.
+    """
+    if table not in TABLES:
+        return "Error: Unknown table", 404
+    # A resume token that doesn't parse must not restart the export, the client would receive rows twice.
+    try:
+        after = ObjectId(request.args['after']) if request.args.get('after') else None
+    except InvalidId:
+        return "Error: Invalid after", 400
+    try:
+        after_song = ObjectId(request.args['after_song']) if request.args.get('after_song') else None
+    except InvalidId:
+        return "Error: Invalid after_song", 400
+    if after_song and table != 'playlist_view':
+        return "Error: after_song only applies to playlist_view", 400
+    if after_song and not after:
+        return "Error: after_song needs after", 400
+    cursor = stream_cursor(table, after, after_song)
+    if request.args.get('format', 'ndjson') == 'json':
+        return Response(stream_with_context(json_array_stream(cursor)), mimetype='application/json')
+    return Response(stream_with_context(ndjson_stream(cursor)), mimetype='application/x-ndjson')
+
+
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify(cache.stats())
+
+
+def to_object_id(value):
+    if isinstance(value, ObjectId):
+        return value
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise ValueError(f"Invalid id: {value!r}")
+
+
+def check_fields(collection_name, document, allow_id=False):
+    unknown = set(document) - set(TABLE_FIELDS[collection_name]) - ({'_id'} if allow_id else set())
+    if unknown:
+        raise ValueError(f"Unknown fields for {collection_name}: {', '.join(sorted(unknown))}")
+
+
+def parse_bulk_operation(operation):
+    """Collection name, document id and pymongo write of one item of a `/bulk_write` request, ValueError if invalid."""
+    if not isinstance(operation, dict):
+        raise ValueError("Operation must be an object")
+    collection_name = operation.get('collection')
+    if collection_name not in TABLE_FIELDS:
+        raise ValueError(f"Unknown collection: {collection_name!r}")
+    op = operation.get('op')
+    if op not in ('insert', 'update', 'delete'):
+        raise ValueError(f"Unknown op: {op!r}")
+
+    if op == 'insert':
+        document = operation.get('document')
+        if not isinstance(document, dict):
+            raise ValueError("insert needs a 'document' object")
+        check_fields(collection_name, document, allow_id=True)
+        # The id is generated here, so it can be reported even though bulk_write doesn't return inserted ids.
+        document = {'_id': ObjectId(), **document}
+        return collection_name, document['_id'], InsertOne(document)
+
+    document_id = to_object_id(operation.get('id'))
+    if op == 'update':
+        updates = operation.get('set')
+        if not isinstance(updates, dict) or not updates:
+            raise ValueError("update needs a non-empty 'set' object")
+        check_fields(collection_name, updates)
+        return collection_name, document_id, UpdateOne({'_id': document_id}, {'$set': updates})
+    return collection_name, document_id, DeleteOne({'_id': document_id})
+
+
+@app.route('/bulk_write', methods=['POST'])
+def bulk_write():
+    """
+    Runs many inserts, updates and deletes from one JSON request, e.g.
+
+        {"operations": [{"op": "insert", "collection": "artists", "document": {"name": "..."}},
+                        {"op": "update", "collection": "songs", "id": "...", "set": {"rating": "4.5"}},
+                        {"op": "delete", "collection": "albums", "id": "..."}]}
+
+    The operations of each collection go out as one unordered `bulk_write`, so an invalid or failing item doesn't
+    stop the others. Every item gets a result with its index, id and error. bulk_write only counts matched and
+    removed documents per collection, so the ids of updates and deletes are looked up before the write. Items whose
+    id matched no document get `ok: false` and `matched: 0`, the way `/update_document` reports them.
+    """
+    try:
+        body = loads(request.get_data(as_text=True))
+    except ValueError:
+        return jsonify({'error': 'Body must be JSON'}), 400
+    operations = body.get('operations') if isinstance(body, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': "Body needs a non-empty 'operations' list"}), 400
+    if len(operations) > MAX_BULK_OPERATIONS:
+        return jsonify({'error': f"At most {MAX_BULK_OPERATIONS} operations per request"}), 413
+
+    results = [None] * len(operations)
+    batches = {}
+    for index, operation in enumerate(operations):
+        try:
+            collection_name, document_id, write = parse_bulk_operation(operation)
+        except ValueError as error:
+            results[index] = {'index': index, 'ok': False, 'error': str(error)}
+            continue
+        batches.setdefault(collection_name, []).append((index, document_id, write))
+
+    totals = {}
+    written = []
+    for collection_name, batch in batches.items():
+        ids = [document_id for _, document_id, write in batch if not isinstance(write, InsertOne)]
+        existing = {document['_id'] for document in db[collection_name].find({'_id': {'$in': ids}}, {'_id': 1})}
+        deleted = set()
+        try:
+            details = db[collection_name].bulk_write([write for _, _, write in batch], ordered=False).bulk_api_result
+        except BulkWriteError as error:
+            details = error.details
+        # Error indexes refer to the position within this collection's batch.
+        write_errors = {write_error['index']: write_error for write_error in details.get('writeErrors', [])}
+        for position, (index, document_id, write) in enumerate(batch):
+            if position in write_errors:
+                results[index] = {'index': index, 'ok': False, 'id': document_id,
+                                  'error': write_errors[position]['errmsg']}
+            elif isinstance(write, InsertOne):
+                results[index] = {'index': index, 'ok': True, 'id': document_id}
+                written.append((collection_name, document_id))
+            elif document_id not in existing or document_id in deleted:
+                # Only one of several deletes of the same id removes it.
+                results[index] = {'index': index, 'ok': False, 'id': document_id, 'matched': 0,
+                                  'error': 'No document found with given id'}
+            else:
+                if isinstance(write, DeleteOne):
+                    deleted.add(document_id)
+                results[index] = {'index': index, 'ok': True, 'id': document_id, 'matched': 1}
+                written.append((collection_name, document_id))
+        totals[collection_name] = {key: details[key] for key in ('nInserted', 'nMatched', 'nModified', 'nRemoved')}
+
+    if written:
+        record_writes(written)
+    return Response(dumps({'results': results, 'totals': totals}), mimetype='application/json')
 
 
 @app.route('/add_document', methods=['POST'])
@@ -112,7 +356,8 @@ def add_document():
     elif collection_name == 'playlists':
         new_document['name'] = request.form['playlist_name']
 
-    db[collection_name].insert_one(new_document)
+    result = db[collection_name].insert_one(new_document)
+    record_write(collection_name, result.inserted_id)
 
     return redirect(url_for('index'))
 
@@ -126,6 +371,7 @@ def delete_document():
         return redirect(url_for('index'))
 
     db[collection_name].delete_one({'_id': ObjectId(document_id)})
+    record_write(collection_name, ObjectId(document_id))
 
     return redirect(url_for('index'))
 
@@ -135,11 +381,6 @@ def update_document():
     document_id = ObjectId(request.form['document_id'])
     collection_name = request.form['collection_name']
 
-    document = db[collection_name].find_one({'_id': document_id})
-
-    if not document:
-        return "Error: Document does not exist", 400
-
     if collection_name not in ['artists', 'albums', 'songs', 'playlists']:
         return redirect(url_for('index'))
 
@@ -163,12 +404,10 @@ def update_document():
             elif key == 'playlist_songs':
                 updates['songs'] = value
 
-    print(document_id)
-    print(updates)
-
     result = db[collection_name].update_one({'_id': document_id}, {'$set': updates})
 
     if result.matched_count == 0:
         return "Error: No document found with given id", 400
+    record_write(collection_name, document_id)
 
     return redirect(url_for('index'))
@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable
+
+
+class QueryCache:
+    """
+    Size-bounded LRU cache of query results, invalidated per collection by the routes that write to it.
+
+    Every entry records the collections its query read. Writes call `invalidate(collection)`, which drops exactly
+    the entries that read that collection. Entries also expire after `ttl` seconds, so writes that bypass the app
+    (e.g. the seeding scripts) show up eventually.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, frozenset[str], Any]] = OrderedDict()
+        # Bumped on every invalidation, so a query that raced with a write doesn't store its stale result.
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key: Hashable, collections: Iterable[str], load: Callable[[], Any]) -> Any:
+        """Cached result of `key`, or the result of `load()` which reads `collections`."""
+        collections = frozenset(collections)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            generations = self._snapshot(collections)
+
+        value = load()
+
+        with self._lock:
+            if self._snapshot(collections) == generations:
+                self._entries[key] = (time.monotonic() + self.ttl, collections, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, collection: str) -> None:
+        """Drops every entry that read `collection`."""
+        with self._lock:
+            self._generations[collection] = self._generations.get(collection, 0) + 1
+            stale = [key for key, (_, collections, _) in self._entries.items() if collection in collections]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / requests if requests else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+    def _snapshot(self, collections: frozenset[str]) -> dict[str, int]:
+        return {collection: self._generations.get(collection, 0) for collection in collections}
@@ -0,0 +1,286 @@
+import argparse
+import threading
+import time
+from collections import Counter
+from typing import Callable, Iterable, Optional
+
+from bson import ObjectId, json_util
+from pymongo import ASCENDING
+from pymongo.database import Database
+from pymongo.errors import OperationFailure, PyMongoError
+
+# Collections the view is built from, a write to any of them can change its rows.
+SOURCE_COLLECTIONS = ['artists', 'albums', 'songs', 'playlists']
+
+# Joins one playlists document to its view rows, one row per song with its artist and album.
+VIEW_STAGES = [
+    {
+        "$lookup": {
+            "from": "songs",
+            "localField": "songs",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"title": 1, "length": 1, "rating": 1, "yt_link": 1, "artist_id": 1,
+                                       "album_id": 1}}],
+            "as": "songs_info"
+        }
+    },
+    {
+        "$unwind": "$songs_info"
+    },
+    {
+        "$lookup": {
+            "from": "artists",
+            "localField": "songs_info.artist_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"name": 1}}],
+            "as": "artist_info"
+        }
+    },
+    {
+        "$unwind": "$artist_info"
+    },
+    {
+        "$lookup": {
+            "from": "albums",
+            "localField": "songs_info.album_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"name": 1}}],
+            "as": "album_info"
+        }
+    },
+    {
+        "$unwind": "$album_info"
+    },
+    {
+        "$project": {
+            "_id": 0,
+            "playlists_id": "$_id",
+            "playlists_name": "$name",
+            "songs_id": "$songs_info._id",
+            "songs_title": "$songs_info.title",
+            "songs_length": "$songs_info.length",
+            "songs_rating": "$songs_info.rating",
+            "songs_yt_link": "$songs_info.yt_link",
+            "artists_id": "$artist_info._id",
+            "artists_name": "$artist_info.name",
+            "albums_id": "$album_info._id",
+            "albums_name": "$album_info.name"
+        }
+    }
+]
+
+# Change stream events after which single documents can no longer be mapped to playlists.
+REBUILD_EVENTS = ['drop', 'rename', 'dropDatabase', 'invalidate']
+
+# Order of the materialized rows, also the index every page is read from.
+VIEW_SORT = [('playlists_id', ASCENDING), ('songs_id', ASCENDING)]
+
+
+class PlaylistView:
+    """
+    The rows of the playlist view materialized in the `playlist_view` collection.
+
+    Writes to the source collections are applied incrementally: only the view rows of the playlists a written
+    document can reach are rebuilt, by running `VIEW_STAGES` on just those playlists. Either the write routes call
+    `apply_write` or, against a replica set, `start_watcher` follows the change stream of the database.
+
+    :param on_change: Called after the collection changed, e.g. to invalidate cached pages.
+    """
+
+    def __init__(self, db: Database, name: str = 'playlist_view', on_change: Optional[Callable[[], None]] = None):
+        self.db = db
+        self.collection = db[name]
+        self.on_change = on_change
+        self.watching = False
+        self._ready = False
+        self._lock = threading.Lock()
+        # Serializes the delete and reinsert of rows, so concurrent refreshes of a playlist can't duplicate them.
+        self._write_lock = threading.Lock()
+
+    def ensure_ready(self, watch: bool = True) -> None:
+        """
+        Creates the indexes, rebuilds the collection if it differs from its sources and starts the watcher on a
+        replica set.
+
+        The sources may have changed while no app was running (e.g. reseeded by mongo_connection.py), so even a
+        non-empty collection is checked.
+        """
+        with self._lock:
+            if self._ready:
+                return
+            self.collection.create_index(VIEW_SORT)
+            # Used to find the playlists a written song, artist or album reaches.
+            self.db.playlists.create_index('songs')
+            self.db.songs.create_index('artist_id')
+            self.db.songs.create_index('album_id')
+            report = self.check_consistency(repair=True)
+            if not report['consistent']:
+                print(f"Rebuilt playlist_view: {len(report['missing'])} rows were missing, "
+                      f"{len(report['unexpected'])} unexpected")
+            if watch and is_replica_set(self.db):
+                self.start_watcher()
+            self._ready = True
+
+    def rebuild(self) -> None:
+        """Replaces the whole collection with the rows of the live pipeline."""
+        with self._write_lock:
+            self.collection.delete_many({})
+            self._insert(self.db.playlists.aggregate(VIEW_STAGES))
+        self._changed()
+
+    def refresh_playlists(self, playlist_ids: Iterable[ObjectId]) -> None:
+        playlist_ids = list(playlist_ids)
+        if not playlist_ids:
+            return
+        with self._write_lock:
+            self.collection.delete_many({'playlists_id': {'$in': playlist_ids}})
+            self._insert(self.db.playlists.aggregate([{"$match": {"_id": {"$in": playlist_ids}}}, *VIEW_STAGES]))
+        self._changed()
+
+    def affected_playlists(self, collection_name: str, document_id: ObjectId) -> list[ObjectId]:
+        """
+        Playlists whose view rows can change when `document_id` of `collection_name` was inserted, updated or deleted.
+
+        Deleted songs, artists and albums are still referenced by the documents that joined them, so this also holds
+        after the write.
+        """
+        if collection_name == 'playlists':
+            return [document_id]
+        if collection_name == 'songs':
+            song_ids = [document_id]
+        elif collection_name in ('artists', 'albums'):
+            field = 'artist_id' if collection_name == 'artists' else 'album_id'
+            song_ids = [song['_id'] for song in self.db.songs.find({field: document_id}, {'_id': 1})]
+        else:
+            return []
+        if not song_ids:
+            return []
+        return [playlist['_id'] for playlist in self.db.playlists.find({'songs': {'$in': song_ids}}, {'_id': 1})]
+
+    def apply_write(self, collection_name: str, document_id: ObjectId) -> None:
+        """Brings the view up to date after a write, unless the watcher does that."""
+        self.apply_writes([(collection_name, document_id)])
+
+    def apply_writes(self, writes: Iterable[tuple[str, ObjectId]]) -> None:
+        """Like `apply_write` for many (collection name, document id) writes, refreshing every playlist once."""
+        if self.watching:
+            return
+        playlist_ids = {}
+        for collection_name, document_id in writes:
+            playlist_ids.update(dict.fromkeys(self.affected_playlists(collection_name, document_id)))
+        self.refresh_playlists(playlist_ids)
+
+    def start_watcher(self) -> threading.Thread:
+        """Follows the change stream of the source collections in a daemon thread."""
+        self.watching = True
+        thread = threading.Thread(target=self._watch, name='playlist-view-watcher', daemon=True)
+        thread.start()
+        return thread
+
+    def _watch(self) -> None:
+        pipeline = [{"$match": {"$or": [
+            {"ns.coll": {"$in": SOURCE_COLLECTIONS}},
+            {"to.coll": {"$in": SOURCE_COLLECTIONS}},
+            {"operationType": {"$in": ["dropDatabase", "invalidate"]}},
+        ]}}]
+        resume_after = None
+        missed_changes = False
+        while True:
+            try:
+                if missed_changes:
+                    self.rebuild()
+                    missed_changes = False
+                with self.db.watch(pipeline, resume_after=resume_after) as stream:
+                    for change in stream:
+                        if change['operationType'] in REBUILD_EVENTS:
+                            self.rebuild()
+                        elif 'documentKey' in change:
+                            self.refresh_playlists(
+                                self.affected_playlists(change['ns']['coll'], change['documentKey']['_id']))
+                        resume_after = stream.resume_token
+                        if change['operationType'] == 'invalidate':
+                            # An invalidated stream can't be resumed, open a new one from now on.
+                            resume_after = None
+                            break
+            except PyMongoError as error:
+                # Changes may have been missed (e.g. the resume token fell off the oplog), start over from scratch.
+                print(f"playlist_view watcher restarts after: {error!r}")
+                resume_after = None
+                missed_changes = True
+                time.sleep(1)
+
+    def check_consistency(self, repair: bool = False) -> dict:
+        """
+        Diffs the collection against the rows of the live pipeline.
+
+        Rows are compared as a multiset, the pipeline does not order songs within a playlist. With `repair`, the
+        collection is rebuilt when they differ.
+        """
+        live = _row_counts(self.db.playlists.aggregate(VIEW_STAGES))
+        materialized = _row_counts(self.collection.find({}, {'_id': 0}))
+        missing = [json_util.loads(row) for row, count in (live - materialized).items() for _ in range(count)]
+        unexpected = [json_util.loads(row) for row, count in (materialized - live).items() for _ in range(count)]
+        report = {
+            'consistent': not missing and not unexpected,
+            'live_rows': sum(live.values()),
+            'materialized_rows': sum(materialized.values()),
+            'missing': missing,
+            'unexpected': unexpected,
+        }
+        if repair and not report['consistent']:
+            self.rebuild()
+        return report
+
+    def _insert(self, rows) -> None:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == 1000:
+                self.collection.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            self.collection.insert_many(batch, ordered=False)
+
+    def _changed(self) -> None:
+        if self.on_change:
+            self.on_change()
+
+
+def is_replica_set(db: Database) -> bool:
+    """Change streams need a replica set (or a sharded cluster)."""
+    try:
+        hello = db.client.admin.command('hello')
+    except OperationFailure:
+        return False
+    return 'setName' in hello or hello.get('msg') == 'isdbgrid'
+
+
+def _row_counts(rows) -> Counter:
+    # Canonical Extended JSON, since Decimal128 values are not hashable.
+    return Counter(json_util.dumps(row, sort_keys=True) for row in rows)
+
+
+def main() -> None:
+    from app import db
+
+    parser = argparse.ArgumentParser(description='Maintain the materialized playlist_view collection.')
+    parser.add_argument('command', choices=['check', 'rebuild'])
+    parser.add_argument('--repair', action='store_true', help='Rebuild the collection if the check finds differences.')
+    args = parser.parse_args()
+
+    view = PlaylistView(db)
+    if args.command == 'rebuild':
+        view.rebuild()
+        return
+    report = view.check_consistency(repair=args.repair)
+    print(f"live rows: {report['live_rows']}, materialized rows: {report['materialized_rows']}")
+    for row in report['missing']:
+        print(f"missing:    {row}")
+    for row in report['unexpected']:
+        print(f"unexpected: {row}")
+    if not report['consistent']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,104 +1,168 @@
-import random
-from bson.json_util import dumps
-import pymongo
-from faker import Faker
-from testcontainers.mongodb import MongoDbContainer
-from bson.decimal128 import Decimal128
-
-faker: Faker = Faker()
+import dataclasses
+from collections import defaultdict
+from typing import Callable, Optional
 
-mongo = MongoDbContainer()
-mongo.start()
-connection_string = mongo.get_connection_url()
-mongo_client = pymongo.MongoClient(connection_string)
-db = mongo_client["DBIMusicPlayer"]
-
-# %%
-for _ in range(100):
-    is_playlist = random.random() < 0.7
-    artists = [] if is_playlist else [faker.name() for _ in range(random.randint(1, 3))]
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from pymongo.database import Database
 
-    playlist_doc = {
-        "name": faker.catch_phrase(),
-        "artists": artists if artists else None
-    }
-    playlist_id = db.playlists.insert_one(playlist_doc).inserted_id
-
-    song_doc = {
-        "title": faker.sentence(),
-        "length": Decimal128(faker.pydecimal(left_digits=2, right_digits=2, positive=True)),
-        "rating": Decimal128(faker.pydecimal(left_digits=1, right_digits=1, positive=True)),
-        "yt_link": faker.url(),
-        "artists": [faker.name() for _ in range(random.randint(1, 3))],
-        "playlists": [playlist_id]
-    }
-    song_id = db.songs.insert_one(song_doc).inserted_id
+import mongo
+from backends import BACKENDS, register_backend
+from dataset import load_dataset
 
-    db.playlists.update_one({"_id": playlist_id}, {"$push": {"songs": song_id}})
+# Embedded document model: songs carry their album name, artist names and playlist ids, playlists carry the ids
+# of their songs. Both sides of the playlist membership are kept in sync by every write.
+EMBEDDED_COLLECTIONS: tuple[str, ...] = ("songs", "playlists")
 
-# %%
-print('First 5 Songs:\n')
-for song in db.songs.find().limit(5):
-    print(song)
-print('\nFirst 5 Playlists:\n')
-for playlist in db.playlists.find().limit(5):
-    print(playlist)
+# Same server and instrumentation as normalized Mongo, recorded under its own name.
+register_backend(dataclasses.replace(BACKENDS['mongo'], name='mongo-embedded'))
 
-# %%
-pipeline = [
+SONGS_IN_A_PLAYLIST_PIPELINE: list[dict] = [
     {
-        '$lookup': {
-            'from': 'playlists',
-            'localField': 'playlists',
-            'foreignField': '_id',
-            'as': 'playlist_info'
+        "$lookup": {
+            "from": "playlists",
+            "localField": "playlists",
+            "foreignField": "_id",
+            "as": "playlist_info"
         }
     },
     {
-        '$unwind': '$playlist_info'
+        "$unwind": "$playlist_info"
     },
     {
-        '$project': {
-            'playlist_id': '$playlist_info._id',
-            'playlist_name': '$playlist_info.name',
-            'song_id': '$_id',
-            'song_title': '$title',
-            'song_length': '$length',
-            'song_rating': '$rating',
-            'song_yt_link': '$yt_link',
-            'artist_names': '$artists',
-            'album_name': {
-                '$cond': {'if': {'$isArray': '$playlist_info.artists'}, 'then': '$playlist_info.name', 'else': ''}}
+        "$project": {
+            "playlist_id": "$playlist_info._id",
+            "playlist_name": "$playlist_info.name",
+            "song_id": "$_id",
+            "song_title": "$title",
+            "song_length": "$length",
+            "song_rating": "$rating",
+            "yt_link": "$yt_link",
+            "artist_names": "$artists",
+            "album_name": "$album",
         }
-    },
-    {
-        '$limit': 5
     }
 ]
 
-results = db.songs.aggregate(pipeline)
-for result in results:
-    print(dumps(result, indent=4))
 
-# %%
+def embedded_performance_test(init_func: Optional[Callable] = None, schema: Optional[Callable] = None,
+                              setup_func: Optional[Callable] = None, teardown_func: Optional[Callable] = None,
+                              explain: Optional[tuple[str, list[dict]]] = None):
+    """`mongo.mongo_performance_test` on the 'mongo-embedded' backend."""
+    return mongo.mongo_performance_test(init_func=init_func, schema=schema, setup_func=setup_func,
+                                        teardown_func=teardown_func, backend='mongo-embedded', explain=explain)
+
+
+def insert_fake_data(mongo_db: Database, n: int) -> None:
+    data = load_dataset(n)
+    for artist_name, album_name, playlist_name, song_title, song_length, song_rating, yt_link in data.rows(
+            n, 'artist_name', 'album_name', 'playlist_name', 'song_title', 'song_length', 'song_rating',
+            'song_yt_link'):
+        playlist_id = mongo_db.playlists.insert_one({"name": playlist_name, "songs": []}).inserted_id
+        song_id = mongo_db.songs.insert_one({
+            "title": song_title,
+            "length": mongo.to_decimal128(song_length, 2),
+            "rating": mongo.to_decimal128(song_rating, 1),
+            "yt_link": yt_link,
+            "album": album_name,
+            "artists": [artist_name],
+            "playlists": [playlist_id]
+        }).inserted_id
+        mongo_db.playlists.update_one({"_id": playlist_id}, {"$push": {"songs": song_id}})
+
+
+def insert_many_fake_data(mongo_db: Database, n: int) -> None:
+    """Denormalizes the first `n` dataset rows client-side and bulk loads both collections."""
+    data = load_dataset(n)
+    artist_names = list(data.column(n, 'artist_name'))
+    album_names = list(data.column(n, 'album_name'))
+    # Ids are generated client-side, so both sides of the playlist membership are known before inserting.
+    playlist_ids = [ObjectId() for _ in range(n)]
+    song_ids = [ObjectId() for _ in range(n)]
+
+    album_artists: defaultdict[int, list[str]] = defaultdict(list)
+    for album, artist in data.rows(n, 'album_artist_album', 'album_artist_artist'):
+        album_artists[album].append(artist_names[artist])
+    playlist_songs: defaultdict[int, list[ObjectId]] = defaultdict(list)
+    song_playlists: defaultdict[int, list[ObjectId]] = defaultdict(list)
+    for playlist, song in data.rows(n, 'playlist_song_playlist', 'playlist_song_song'):
+        playlist_songs[playlist].append(song_ids[song])
+        song_playlists[song].append(playlist_ids[playlist])
+
+    mongo_db.playlists.insert_many(
+        {"_id": playlist_ids[i], "name": name, "songs": playlist_songs[i]}
+        for i, name in enumerate(data.column(n, 'playlist_name'))
+    )
+    mongo_db.songs.insert_many(
+        {
+            "_id": song_ids[i],
+            "title": title,
+            "length": mongo.to_decimal128(length, 2),
+            "rating": mongo.to_decimal128(rating, 1),
+            "yt_link": yt_link,
+            "album": album_names[album],
+            "artists": album_artists[album],
+            "playlists": song_playlists[i],
+        }
+        for i, (title, length, rating, yt_link, album) in enumerate(data.rows(
+            n, 'song_title', 'song_length', 'song_rating', 'song_yt_link', 'song_album'))
+    )
+
+
+def reseed_fake_data(mongo_db: Database, n: int) -> None:
+    mongo.reseed_collections(mongo_db, n, insert_many_fake_data, EMBEDDED_COLLECTIONS)
+
+
+def push_song(mongo_db: Database, playlist_id: ObjectId, song_id: ObjectId) -> None:
+    mongo_db.playlists.update_one({"_id": playlist_id}, {"$push": {"songs": song_id}})
+    mongo_db.songs.update_one({"_id": song_id}, {"$push": {"playlists": playlist_id}})
+
+
+def pull_song(mongo_db: Database, playlist_id: ObjectId, song_id: ObjectId) -> None:
+    mongo_db.playlists.update_one({"_id": playlist_id}, {"$pull": {"songs": song_id}})
+    mongo_db.songs.update_one({"_id": song_id}, {"$pull": {"playlists": playlist_id}})
+
+
+@embedded_performance_test()
+def test_insert_performance(mongo_db: Database, n: int) -> None:
+    insert_fake_data(mongo_db, n)
+
+
+@embedded_performance_test()
+def test_insert_many_performance(mongo_db: Database, n: int) -> None:
+    insert_many_fake_data(mongo_db, n)
+
+
+@embedded_performance_test(init_func=insert_many_fake_data, explain=("songs", SONGS_IN_A_PLAYLIST_PIPELINE))
+def test_read_performance(mongo_db: Database) -> None:
+    songs_in_playlist = mongo_db.songs.aggregate(SONGS_IN_A_PLAYLIST_PIPELINE)
+    _ = list(songs_in_playlist)
+
+
+@embedded_performance_test(setup_func=reseed_fake_data)
+def test_delete_performance(mongo_db: Database) -> None:
+    mongo_db.playlists.delete_many({})
+    mongo_db.songs.delete_many({})
+
+
+@embedded_performance_test(setup_func=reseed_fake_data)
+def test_update_performance(mongo_db: Database) -> None:
+    # Artist names are embedded, so renaming them rewrites every song instead of one artists collection.
+    mongo_db.songs.update_many({}, {"$set": {"artists.$[]": "Updated Artist Name", "length": Decimal128("3.50")}})
 
-print("\nAdd song to playlist\n---------------\n")
-playlist = db.playlists.find_one()
-print("BEFORE:\n", playlist)
-song = db.songs.find_one()
-db.playlists.update_one({"_id": playlist["_id"]}, {"$push": {"songs": song["_id"]}})
-playlist = db.playlists.find_one({"_id": playlist["_id"]})
-print("AFTER:\n", playlist)
 
-# %%
+@embedded_performance_test(setup_func=reseed_fake_data)
+def test_playlist_push_performance(mongo_db: Database, n_ops: int = 100) -> None:
+    """Adds the i-th song to the i-th playlist for the first `n_ops` of each, updating both documents."""
+    playlist_ids = [playlist["_id"] for playlist in mongo_db.playlists.find({}, {"_id": 1}).limit(n_ops)]
+    song_ids = [song["_id"] for song in mongo_db.songs.find({}, {"_id": 1}).limit(n_ops)]
+    for playlist_id, song_id in zip(playlist_ids, song_ids):
+        push_song(mongo_db, playlist_id, song_id)
 
 
-print("\nDelete song from playlist\n---------------\n")
-playlist = db.playlists.find_one()
-song = db.songs.find_one()
-print("Playlist BEFORE deletion:\n", playlist)
-playlist_id = playlist['_id']
-song_id = song['_id']
-db.playlists.update_one({"_id": playlist_id}, {"$pull": {"songs": song_id}})
-playlist_after_deletion = db.playlists.find_one({"_id": playlist_id})
-print("Playlist AFTER deletion:\n", playlist_after_deletion)
+@embedded_performance_test(setup_func=reseed_fake_data)
+def test_playlist_pull_performance(mongo_db: Database, n_ops: int = 100) -> None:
+    """Removes the first song of the first `n_ops` non-empty playlists, updating both documents."""
+    playlists = mongo_db.playlists.find({"songs.0": {"$exists": True}}, {"songs": {"$slice": 1}}).limit(n_ops)
+    for playlist in list(playlists):
+        pull_song(mongo_db, playlist["_id"], playlist["songs"][0])
@@ -0,0 +1,246 @@
+import os
+import random
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import postgres
+from backends import Backend, performance_test, register_backend
+from dataset import DEFAULT_SEED, load_dataset
+from explain import summarize_sqlite_plan
+from resources import ResourceProbe
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+EMBEDDED_SQL_DIR: Path = Path(os.environ.get('EMBEDDED_SQL_DIR', Path(tempfile.gettempdir()) / 'dbi-embedded-sql'))
+
+# Primary key and remaining columns of the tables of postgres.create_postgres_schema. Foreign keys are left out,
+# SQLite does not enforce them by default and DuckDB cannot update rows that are still referenced.
+TABLES: dict[str, tuple[str, tuple[str, ...]]] = {
+    "A_Artists": ("A_ID", ("A_Name VARCHAR",)),
+    "Al_Albums": ("Al_ID", ("Al_Name VARCHAR",)),
+    "Al_Albums_have_A_Artists": ("Al_A_ID", ("Al_ID INTEGER", "A_ID INTEGER")),
+    "P_Playlists": ("P_ID", ("P_Name VARCHAR",)),
+    "S_Songs": ("S_ID", ("S_Title VARCHAR", "S_Length DECIMAL(5,2)", "S_Rating DECIMAL(2,1)", "S_YT_Link VARCHAR",
+                         "S_Al_ID INTEGER")),
+    "P_Playlists_have_S_Songs": ("P_S_ID", ("P_ID INTEGER", "S_ID INTEGER")),
+}
+
+Connection = sqlite3.Connection if duckdb is None else sqlite3.Connection | duckdb.DuckDBPyConnection
+
+
+def is_duckdb(connection: Connection) -> bool:
+    return duckdb is not None and isinstance(connection, duckdb.DuckDBPyConnection)
+
+
+@contextmanager
+def transaction(connection: Connection) -> Iterator[Connection]:
+    """Explicit transaction that behaves the same on sqlite3 (which otherwise opens them implicitly) and DuckDB."""
+    connection.execute("BEGIN TRANSACTION")
+    try:
+        yield connection
+    except Exception:
+        connection.rollback()
+        raise
+    connection.commit()
+
+
+def create_embedded_sql_schema(connection: Connection) -> None:
+    """The tables and the SongsInAPlaylist view of the Postgres schema in SQL both SQLite and DuckDB accept."""
+    with transaction(connection):
+        for table, (id_column, columns) in TABLES.items():
+            if is_duckdb(connection):
+                # DuckDB has no SERIAL, the sequence gives single-row inserts their ids.
+                connection.execute(f"CREATE SEQUENCE {table}_ID_Seq")
+                id_definition = f"{id_column} INTEGER PRIMARY KEY DEFAULT nextval('{table}_ID_Seq')"
+            else:
+                id_definition = f"{id_column} INTEGER PRIMARY KEY"
+            connection.execute(f"CREATE TABLE {table} ({', '.join((id_definition, *columns))})")
+        connection.execute(f"""
+        CREATE VIEW SongsInAPlaylist AS
+        SELECT {postgres.SONGS_IN_A_PLAYLIST_COLUMNS} {postgres.SONGS_IN_A_PLAYLIST_JOINS}
+        ORDER BY P_Playlists.P_Id, S_Songs.S_Id
+        """)
+
+
+def _database_path(name: str) -> Path:
+    """Path of a new database file, one per process so parallel orchestrator workers don't share it."""
+    EMBEDDED_SQL_DIR.mkdir(parents=True, exist_ok=True)
+    name = f"{os.getpid()}-{name}"
+    path = EMBEDDED_SQL_DIR / name
+    for leftover in EMBEDDED_SQL_DIR.glob(f"{name}*"):
+        leftover.unlink()
+    return path
+
+
+@contextmanager
+def sqlite_session(schema: Callable[[Connection], None]) -> Iterator[sqlite3.Connection]:
+    """Yields a connection to a new database file with `schema` applied."""
+    connection = sqlite3.connect(_database_path('benchmark.sqlite'))
+    try:
+        schema(connection)
+        yield connection
+    finally:
+        connection.close()
+
+
+@contextmanager
+def duckdb_session(schema: Callable[[Connection], None]) -> Iterator[Connection]:
+    """Yields a connection to a new database file with `schema` applied."""
+    connection = duckdb.connect(str(_database_path('benchmark.duckdb')))
+    try:
+        schema(connection)
+        yield connection
+    finally:
+        connection.close()
+
+
+def explain_sqlite_query(connection: sqlite3.Connection, query: str) -> dict:
+    rows = connection.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+    return {'raw': rows, 'summary': summarize_sqlite_plan(rows)}
+
+
+def embedded_sql_storage_sizes(connection: Connection) -> dict:
+    """Table and index bytes per table (SQLite with the dbstat table), the used database blocks otherwise."""
+    if is_duckdb(connection):
+        block_size, used_blocks = connection.execute(
+            "SELECT block_size, used_blocks FROM pragma_database_size()").fetchone()
+        return {'_database': {'data': block_size * used_blocks}}
+    try:
+        rows = connection.execute("""SELECT sqlite_master.tbl_name, sqlite_master.type, SUM(dbstat.pgsize)
+            FROM dbstat JOIN sqlite_master ON sqlite_master.name = dbstat.name
+            WHERE sqlite_master.type IN ('table', 'index') GROUP BY 1, 2""").fetchall()
+    except sqlite3.OperationalError:
+        page_count, = connection.execute("PRAGMA page_count").fetchone()
+        page_size, = connection.execute("PRAGMA page_size").fetchone()
+        return {'_database': {'data': page_count * page_size}}
+    sizes = {}
+    for table, kind, size in rows:
+        sizes.setdefault(table, {'table': 0, 'indexes': 0})['table' if kind == 'table' else 'indexes'] += size
+    return sizes
+
+
+EMBEDDED_SQL_RESOURCE_PROBE = ResourceProbe(sizes=embedded_sql_storage_sizes)
+
+register_backend(Backend(
+    name='sqlite',
+    session=sqlite_session,
+    default_schema=create_embedded_sql_schema,
+    metadata=lambda connection: {'server_version': sqlite3.sqlite_version},
+    resource_probe=EMBEDDED_SQL_RESOURCE_PROBE,
+    explain=explain_sqlite_query,
+))
+if duckdb is not None:
+    register_backend(Backend(
+        name='duckdb',
+        session=duckdb_session,
+        default_schema=create_embedded_sql_schema,
+        metadata=lambda connection: {'server_version': duckdb.__version__},
+        resource_probe=EMBEDDED_SQL_RESOURCE_PROBE,
+    ))
+
+EMBEDDED_SQL_BACKENDS: list[str] = ['sqlite'] + (['duckdb'] if duckdb is not None else [])
+
+
+def embedded_sql_performance_test(init_func: Optional[Callable] = None, schema: Optional[Callable] = None,
+                                  setup_func: Optional[Callable] = None, teardown_func: Optional[Callable] = None,
+                                  explain: Optional[str] = None):
+    """
+    `backends.performance_test` on the 'sqlite' backend, call with `backend='duckdb'` to run on DuckDB instead.
+
+    :param explain: Query the decorated function reads with, captured with `EXPLAIN QUERY PLAN` on SQLite.
+    """
+    return performance_test('sqlite', init_func, schema, setup_func, teardown_func, explain)
+
+
+def insert_fake_data(connection: Connection, n: int, seed: int = DEFAULT_SEED) -> None:
+    """Single-row inserts that pick foreign keys from the ids returned by the inserts of this call."""
+    rng = random.Random(seed)
+    data = load_dataset(n)
+    artist_ids, album_ids, playlist_ids, song_ids = [], [], [], []
+    with transaction(connection):
+        for artist_name, album_name, playlist_name, song_title, song_length, song_rating, yt_link in data.rows(
+                n, 'artist_name', 'album_name', 'playlist_name', 'song_title', 'song_length', 'song_rating',
+                'song_yt_link'):
+            artist_ids.append(connection.execute(
+                "INSERT INTO A_Artists (A_Name) VALUES (?) RETURNING A_ID", (artist_name,)).fetchone()[0])
+            album_ids.append(connection.execute(
+                "INSERT INTO Al_Albums (Al_Name) VALUES (?) RETURNING Al_ID", (album_name,)).fetchone()[0])
+            playlist_ids.append(connection.execute(
+                "INSERT INTO P_Playlists (P_Name) VALUES (?) RETURNING P_ID", (playlist_name,)).fetchone()[0])
+            song_ids.append(connection.execute(
+                """INSERT INTO S_Songs (S_Title, S_Length, S_Rating, S_YT_Link, S_Al_ID)
+                VALUES (?, ?, ?, ?, ?) RETURNING S_ID""",
+                (song_title, song_length, song_rating, yt_link, rng.choice(album_ids))).fetchone()[0])
+            connection.execute("INSERT INTO Al_Albums_have_A_Artists (Al_ID, A_ID) VALUES (?, ?)",
+                               (rng.choice(album_ids), rng.choice(artist_ids)))
+            connection.execute("INSERT INTO P_Playlists_have_S_Songs (P_ID, S_ID) VALUES (?, ?)",
+                               (rng.choice(playlist_ids), rng.choice(song_ids)))
+
+
+def insert_many_fake_data(connection: Connection, n: int) -> None:
+    """One `executemany` per table, referencing the ids 1..n the way `postgres.insert_many_fake_data` does."""
+    with transaction(connection):
+        for table, rows in postgres.generate_fake_rows(n).items():
+            columns = postgres.TABLE_COLUMNS[table]
+            connection.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", list(rows)
+            )
+
+
+def reseed_fake_data(connection: Connection, n: int) -> None:
+    """
+    Empties all tables and bulk loads the first `n` dataset rows again, with ids starting at 1.
+
+    SQLite reuses the ids of deleted rows. DuckDB sequences cannot be restarted, so its schema is recreated.
+    """
+    if is_duckdb(connection):
+        with transaction(connection):
+            connection.execute("DROP VIEW SongsInAPlaylist")
+            for table in TABLES:
+                connection.execute(f"DROP TABLE {table}")
+                connection.execute(f"DROP SEQUENCE {table}_ID_Seq")
+        create_embedded_sql_schema(connection)
+    else:
+        with transaction(connection):
+            for table in TABLES:
+                connection.execute(f"DELETE FROM {table}")
+    insert_many_fake_data(connection, n)
+
+
+@embedded_sql_performance_test(init_func=insert_many_fake_data, explain="SELECT * FROM SongsInAPlaylist")
+def test_read_performance(connection: Connection) -> None:
+    _ = connection.execute("SELECT * FROM SongsInAPlaylist").fetchall()
+
+
+@embedded_sql_performance_test()
+def test_insert_performance(connection: Connection, n: int) -> None:
+    insert_fake_data(connection, n)
+
+
+@embedded_sql_performance_test()
+def test_insert_many_performance(connection: Connection, n: int) -> None:
+    insert_many_fake_data(connection, n)
+
+
+@embedded_sql_performance_test(setup_func=reseed_fake_data)
+def test_delete_performance(connection: Connection) -> None:
+    with transaction(connection):
+        connection.execute("DELETE FROM P_Playlists_have_S_Songs")
+        connection.execute("DELETE FROM S_Songs")
+        connection.execute("DELETE FROM Al_Albums_have_A_Artists")
+        connection.execute("DELETE FROM P_Playlists")
+        connection.execute("DELETE FROM Al_Albums")
+        connection.execute("DELETE FROM A_Artists")
+
+
+@embedded_sql_performance_test(setup_func=reseed_fake_data)
+def test_update_performance(connection: Connection) -> None:
+    with transaction(connection):
+        connection.execute("UPDATE A_Artists SET A_Name = 'Updated Artist Name'")
+        connection.execute("UPDATE S_Songs SET S_Length = 3.50")
@@ -1,197 +1,531 @@
-from plotting import plot_performance_comparison
+import argparse
+import functools
+from typing import Callable
+
+import async_mongo
+import async_postgres
+import embedded_mongo
+import embedded_sql
+from dataset import load_dataset
+from performance_test import BenchmarkResult
+from plotting import plot_load_results, plot_performance_comparison, plot_scaling_curves, plot_streaming_results
+from scaling import fit_complexity
 import postgres
 import mongo
 
 SCALING_STAGES = [100, 1_000, 100_000]
+SWEEP_STAGES = [100, 1_000, 10_000, 100_000, 1_000_000]
+SWEEP_N_TESTS = 10
+BULK_INSERT_STAGES = [10_000, 100_000, 1_000_000, 10_000_000]
 
 
 def extrapolate_performance(
-        mean_std: tuple[float, float], original_n: int, scaling_stages=None
-) -> list[tuple[float, float]]:
+        result: BenchmarkResult, original_n: int, scaling_stages=None
+) -> list[BenchmarkResult]:
     scaling_stages = scaling_stages or SCALING_STAGES
+    return [result.scaled(scale / original_n) for scale in scaling_stages]
+
+
+def measure_scaling(test_func: Callable, scaling_stages=None, n_tests: int = SWEEP_N_TESTS) -> list[BenchmarkResult]:
+    """Seeds and measures `test_func` at every size instead of extrapolating from a single one."""
+    scaling_stages = scaling_stages or SWEEP_STAGES
+    return [test_func(n=n, n_tests=n_tests) for n in scaling_stages]
 
-    def scale_performance(scale: int) -> tuple[float, float]:
-        mean, std = mean_std
-        factor = scale / original_n
-        return mean * factor, std * factor
 
-    return [scale_performance(scale) for scale in scaling_stages]
+def run_sweep(title: str, tests: dict[str, Callable], scaling_stages=None, n_tests: int = SWEEP_N_TESTS) -> None:
+    scaling_stages = scaling_stages or SWEEP_STAGES
+    load_dataset(max(scaling_stages))
+    results_list = [measure_scaling(test_func, scaling_stages, n_tests) for test_func in tests.values()]
+    fits = [fit_complexity(results, scaling_stages) for results in results_list]
+    for label, (model, a, b) in zip(tests, fits):
+        print(f"'{label}' - best fit: {model} (a={a:.3e}, b={b:.3e})")
+
+    plot_scaling_curves(
+        title=title,
+        results_list=results_list,
+        fits=fits,
+        labels=list(tests),
+        scaling_stages=scaling_stages,
+    )
 
 
-def test_inserts() -> None:
+def test_inserts(sweep: bool = False) -> None:
     n = 100
     n_tests = 1000
-    insert_one_mean_std_mongo: tuple[float, float] = mongo.test_insert_performance(n=n, n_tests=n_tests)  # type: ignore
-    insert_one_mean_std_pg: tuple[float, float] = postgres.test_insert_performance(n=n, n_tests=n_tests)  # type: ignore
-    insert_many_mean_std_pg: tuple[float, float] = postgres.test_insert_many_performance(n=n, n_tests=n_tests)  # type: ignore
-    insert_many_mean_std_mongo: tuple[float, float] = mongo.test_insert_many_performance(n=n, n_tests=n_tests)  # type: ignore
+    insert_one_mongo: BenchmarkResult = mongo.test_insert_performance(n=n, n_tests=n_tests)  # type: ignore
+    insert_one_pg: BenchmarkResult = postgres.test_insert_performance(n=n, n_tests=n_tests)  # type: ignore
+    insert_many_pg: BenchmarkResult = postgres.test_insert_many_performance(n=n, n_tests=n_tests)  # type: ignore
+    insert_many_mongo: BenchmarkResult = mongo.test_insert_many_performance(n=n, n_tests=n_tests)  # type: ignore
 
     labels = ['MongoDB Insert', 'MongoDB Insert Many', 'Postgres Insert', 'Postgres Insert Many']
     plot_performance_comparison(
         title='MongoDB vs Postgres - Insert vs Insert Many Performance Comparison',
         results_list=[
-            [insert_one_mean_std_mongo],
-            [insert_many_mean_std_mongo],
-            [insert_one_mean_std_pg],
-            [insert_many_mean_std_pg],
+            [insert_one_mongo],
+            [insert_many_mongo],
+            [insert_one_pg],
+            [insert_many_pg],
         ],
         labels=labels,
         scaling_stages=[n]
     )
 
+    if sweep:
+        run_sweep(
+            title='MongoDB vs Postgres - Insert vs Insert Many Performance Comparison at Scale (Measured)',
+            tests={
+                'MongoDB Insert': mongo.test_insert_performance,
+                'MongoDB Insert Many': mongo.test_insert_many_performance,
+                'Postgres Insert': postgres.test_insert_performance,
+                'Postgres Insert Many': postgres.test_insert_many_performance,
+            },
+        )
+        return
+
     plot_performance_comparison(
         title='MongoDB vs Postgres - Insert vs Insert Many Performance Comparison at Scale',
         results_list=[
-            extrapolate_performance(insert_one_mean_std_mongo, n),
-            extrapolate_performance(insert_many_mean_std_mongo, n),
-            extrapolate_performance(insert_one_mean_std_pg, n),
-            extrapolate_performance(insert_many_mean_std_pg, n),
+            extrapolate_performance(insert_one_mongo, n),
+            extrapolate_performance(insert_many_mongo, n),
+            extrapolate_performance(insert_one_pg, n),
+            extrapolate_performance(insert_many_pg, n),
         ],
         labels=labels,
         scaling_stages=SCALING_STAGES
     )
 
 
-def test_reads() -> None:
+def test_reads(sweep: bool = False) -> None:
     n = 100
     n_tests = 1000
-    read_mean_std_mongo: tuple[float, float] = mongo.test_read_performance(n=n, n_tests=n_tests)  # type: ignore
-    read_mean_std_pg: tuple[float, float] = postgres.test_read_performance(n=n, n_tests=n_tests)  # type: ignore
+    read_mongo: BenchmarkResult = mongo.test_read_performance(n=n, n_tests=n_tests)  # type: ignore
+    read_pg: BenchmarkResult = postgres.test_read_performance(n=n, n_tests=n_tests)  # type: ignore
 
     plot_performance_comparison(
         title='MongoDB vs Postgres - Read Performance Comparison',
         results_list=[
-            [read_mean_std_mongo],
-            [read_mean_std_pg]
+            [read_mongo],
+            [read_pg]
         ],
         labels=['MongoDB Read', 'Postgres Read'],
         scaling_stages=[n]
     )
 
     scaling_stages = [250, 500, 1_000, 2_000]
+    if sweep:
+        run_sweep(
+            title='MongoDB vs Postgres - Read Performance Comparison at Scale (Measured)',
+            tests={'MongoDB Read': mongo.test_read_performance, 'Postgres Read': postgres.test_read_performance},
+        )
+        return
+
     plot_performance_comparison(
         title='MongoDB vs Postgres - Read Performance Comparison at Scale',
         results_list=[
-            extrapolate_performance(read_mean_std_mongo, n),
-            extrapolate_performance(read_mean_std_pg, n)
+            extrapolate_performance(read_mongo, n),
+            extrapolate_performance(read_pg, n)
         ],
         labels=['MongoDB Read', 'Postgres Read'],
         scaling_stages=SCALING_STAGES
     )
 
 
-def test_deletes() -> None:
+def test_deletes(sweep: bool = False) -> None:
     n = 100
     n_tests = 10_000
-    delete_mean_std_mongo: tuple[float, float] = mongo.test_delete_performance(n=n, n_tests=n_tests)  # type: ignore
-    delete_mean_std_pg: tuple[float, float] = postgres.test_delete_performance(n=n, n_tests=n_tests)  # type: ignore
+    delete_mongo: BenchmarkResult = mongo.test_delete_performance(n=n, n_tests=n_tests)  # type: ignore
+    delete_pg: BenchmarkResult = postgres.test_delete_performance(n=n, n_tests=n_tests)  # type: ignore
 
     plot_performance_comparison(
         title='MongoDB vs Postgres - Delete Performance Comparison',
         results_list=[
-            [delete_mean_std_mongo],
-            [delete_mean_std_pg]
+            [delete_mongo],
+            [delete_pg]
         ],
         labels=['MongoDB Delete', 'Postgres Delete'],
         scaling_stages=[n]
     )
 
+    if sweep:
+        run_sweep(
+            title='MongoDB vs Postgres - Delete Performance Comparison at Scale (Measured)',
+            tests={'MongoDB Delete': mongo.test_delete_performance, 'Postgres Delete': postgres.test_delete_performance},
+        )
+        return
+
     plot_performance_comparison(
         title='MongoDB vs Postgres - Delete Performance Comparison at Scale',
         results_list=[
-            extrapolate_performance(delete_mean_std_mongo, n),
-            extrapolate_performance(delete_mean_std_pg,n)
+            extrapolate_performance(delete_mongo, n),
+            extrapolate_performance(delete_pg,n)
         ],
         labels=['MongoDB Delete', 'Postgres Delete'],
         scaling_stages=SCALING_STAGES
     )
 
 
-def test_updates() -> None:
+def test_updates(sweep: bool = False) -> None:
     n = 100
     n_tests = 10_000
-    update_mean_std_mongo: tuple[float, float] = mongo.test_update_performance(init_func_n=n, n_tests=n_tests)  # type: ignore
-    update_mean_std_pg: tuple[float, float] = postgres.test_update_performance(init_func_n=n, n_tests=n_tests)  # type: ignore
+    update_mongo: BenchmarkResult = mongo.test_update_performance(init_func_n=n, n_tests=n_tests)  # type: ignore
+    update_pg: BenchmarkResult = postgres.test_update_performance(init_func_n=n, n_tests=n_tests)  # type: ignore
 
     plot_performance_comparison(
         title='MongoDB vs Postgres - Update Performance Comparison',
         results_list=[
-            [update_mean_std_mongo],
-            [update_mean_std_pg]
+            [update_mongo],
+            [update_pg]
         ],
         labels=['MongoDB Update', 'Postgres Update'],
         scaling_stages=[n]
     )
 
+    if sweep:
+        run_sweep(
+            title='MongoDB vs Postgres - Update Performance Comparison at Scale (Measured)',
+            tests={'MongoDB Update': mongo.test_update_performance, 'Postgres Update': postgres.test_update_performance},
+        )
+        return
+
     plot_performance_comparison(
         title='MongoDB vs Postgres - Update Performance Comparison at Scale',
         results_list=[
-            extrapolate_performance(update_mean_std_mongo, n),
-            extrapolate_performance(update_mean_std_pg, n)
+            extrapolate_performance(update_mongo, n),
+            extrapolate_performance(update_pg, n)
         ],
         labels=['MongoDB Update', 'Postgres Update'],
         scaling_stages=SCALING_STAGES
     )
 
-def test_reads_unique():
+def test_reads_unique(sweep: bool = False) -> None:
     n = 100
     n_tests = 1000
-    read_mean_std_mongo: tuple[float, float] = mongo.test_unique_read_performance(n=n, n_tests=n_tests)  # type: ignore
-    read_mean_std_pg: tuple[float, float] = postgres.test_read_performance(n=n, n_tests=n_tests)  # type: ignore
+    read_mongo: BenchmarkResult = mongo.test_unique_read_performance(n=n, n_tests=n_tests)  # type: ignore
+    read_pg: BenchmarkResult = postgres.test_read_performance(n=n, n_tests=n_tests)  # type: ignore
 
     plot_performance_comparison(
         title='MongoDB - with index vs Postgres - Read Performance Comparison',
         results_list=[
-            [read_mean_std_mongo],
-            [read_mean_std_pg]
+            [read_mongo],
+            [read_pg]
         ],
         labels=['MongoDB Read', 'Postgres Read'],
         scaling_stages=[n]
     )
 
+    if sweep:
+        run_sweep(
+            title='MongoDB (with index) vs Postgres - Read Performance Comparison at Scale (Measured)',
+            tests={'MongoDB Read': mongo.test_unique_read_performance, 'Postgres Read': postgres.test_read_performance},
+        )
+        return
+
     plot_performance_comparison(
         title='MongoDB (with index) vs Postgres - Read Performance Comparison at Scale',
         results_list=[
-            extrapolate_performance(read_mean_std_mongo, n),
-            extrapolate_performance(read_mean_std_pg, n)
+            extrapolate_performance(read_mongo, n),
+            extrapolate_performance(read_pg, n)
         ],
         labels=['MongoDB Read', 'Postgres Read'],
         scaling_stages=SCALING_STAGES
     )
 
 
-def test_insert_unique():
+def test_insert_unique(sweep: bool = False) -> None:
     n = 30
     n_tests = 1000
-    insert_one_mean_std_mongo: tuple[float, float] = mongo.test_unique_insert_performance(n=n, n_tests=n_tests)  # type: ignore
-    insert_one_mean_std_pg: tuple[float, float] = postgres.test_insert_performance(n=n, n_tests=n_tests)  # type: ignore
+    insert_one_mongo: BenchmarkResult = mongo.test_unique_insert_performance(n=n, n_tests=n_tests)  # type: ignore
+    insert_one_pg: BenchmarkResult = postgres.test_insert_performance(n=n, n_tests=n_tests)  # type: ignore
 
     labels = ['MongoDB Insert', 'Postgres Insert']
     plot_performance_comparison(
         title='MongoDB - with index vs Postgres - Insert Performance Comparison',
         results_list=[
-            [insert_one_mean_std_mongo],
-            [insert_one_mean_std_pg],
+            [insert_one_mongo],
+            [insert_one_pg],
         ],
         labels=labels,
         scaling_stages=[n]
     )
 
+    if sweep:
+        run_sweep(
+            title='MongoDB (with index) vs Postgres - Insert Performance Comparison at Scale (Measured)',
+            tests={'MongoDB Insert': mongo.test_unique_insert_performance, 'Postgres Insert': postgres.test_insert_performance},
+        )
+        return
+
     plot_performance_comparison(
         title='MongoDB (with index) vs Postgres - Insert Performance Comparison at Scale',
         results_list=[
-            extrapolate_performance(insert_one_mean_std_mongo, n),
-            extrapolate_performance(insert_one_mean_std_pg, n),
+            extrapolate_performance(insert_one_mongo, n),
+            extrapolate_performance(insert_one_pg, n),
         ],
         labels=labels,
         scaling_stages=SCALING_STAGES
     )
 
 
+def test_bulk_inserts() -> None:
+    run_sweep(
+        title='Postgres - executemany vs execute_values vs COPY Insert Performance Comparison',
+        tests={
+            'Postgres executemany': postgres.test_insert_many_performance,
+            'Postgres execute_values': postgres.test_insert_execute_values_performance,
+            'Postgres COPY': postgres.test_insert_copy_performance,
+            'MongoDB Insert Many': mongo.test_insert_many_performance,
+        },
+        scaling_stages=BULK_INSERT_STAGES,
+        n_tests=3,
+    )
+
+
+def test_concurrency() -> None:
+    n = 1_000
+    duration = 10.0
+    labels = ['MongoDB Read', 'Postgres Read']
+    plot_load_results(
+        title='MongoDB vs Postgres - Read Throughput and Latency under Concurrent Load',
+        results_list=[
+            mongo.mongo_load_test(mongo.test_read_performance, init_func=mongo.insert_many_fake_data, n=n,
+                                  duration=duration),
+            postgres.postgres_load_test(postgres.test_read_performance, init_func=postgres.insert_many_fake_data,
+                                        n=n, duration=duration),
+        ],
+        labels=labels,
+    )
+
+    labels = ['MongoDB Insert', 'Postgres Insert']
+    plot_load_results(
+        title='MongoDB vs Postgres - Insert Throughput and Latency under Concurrent Load',
+        results_list=[
+            mongo.mongo_load_test(mongo.test_insert_performance, n=1, duration=duration),
+            postgres.postgres_load_test(postgres.test_insert_performance, n=1, duration=duration),
+        ],
+        labels=labels,
+    )
+
+
+def test_async() -> None:
+    n = 1_000
+    n_tests = 1000
+    concurrency_levels = [1, 4, 16, 64]
+    read_pg: BenchmarkResult = postgres.test_read_performance(n=n, n_tests=n_tests)  # type: ignore
+    read_mongo: BenchmarkResult = mongo.test_read_performance(n=n, n_tests=n_tests)  # type: ignore
+
+    plot_performance_comparison(
+        title='MongoDB vs Postgres - Sync vs Async Read Latency by Operations in Flight',
+        results_list=[
+            [read_mongo] * len(concurrency_levels),
+            [
+                async_mongo.test_read_performance(n=n, n_tests=n_tests, concurrency=concurrency)
+                for concurrency in concurrency_levels
+            ],
+            [read_pg] * len(concurrency_levels),
+            [
+                async_postgres.test_read_performance(n=n, n_tests=n_tests, concurrency=concurrency)
+                for concurrency in concurrency_levels
+            ],
+        ],
+        labels=['MongoDB Sync Read', 'MongoDB Async Read (Motor)', 'Postgres Sync Read',
+                'Postgres Async Read (asyncpg)'],
+        scaling_stages=concurrency_levels
+    )
+
+
+def test_materialized_view() -> None:
+    n = 1_000
+    n_tests = 100
+    labels = ['Postgres View', 'Postgres Trigger-Maintained Table', 'Postgres Materialized View (Concurrent Refresh)']
+    plot_performance_comparison(
+        title='Postgres - Plain vs Materialized SongsInAPlaylist Read Performance Comparison',
+        results_list=[
+            [postgres.test_read_performance(n=n, n_tests=n_tests)],
+            [postgres.test_read_incremental_view_performance(n=n, n_tests=n_tests)],
+            [postgres.test_read_materialized_view_performance(n=n, n_tests=n_tests)],
+        ],
+        labels=labels,
+        scaling_stages=[n]
+    )
+
+    plot_performance_comparison(
+        title='Postgres - Plain vs Materialized SongsInAPlaylist Insert Many Performance Comparison',
+        results_list=[
+            [postgres.test_insert_many_performance(n=n, n_tests=n_tests)],
+            [postgres.test_insert_many_incremental_view_performance(n=n, n_tests=n_tests)],
+            [postgres.test_insert_many_materialized_view_performance(n=n, n_tests=n_tests)],
+        ],
+        labels=labels,
+        scaling_stages=[n]
+    )
+
+    n = 100
+    plot_performance_comparison(
+        title='Postgres - Plain vs Trigger-Maintained SongsInAPlaylist Insert Performance Comparison',
+        results_list=[
+            [postgres.test_insert_performance(n=n, n_tests=n_tests)],
+            [postgres.test_insert_incremental_view_performance(n=n, n_tests=n_tests)],
+        ],
+        labels=labels[:2],
+        scaling_stages=[n]
+    )
+
+
+def test_index_matrix() -> None:
+    scaling_stages = [1_000, 10_000, 100_000]
+    n_tests = 10
+    operations = {
+        'Read': postgres.test_read_performance,
+        'Insert Many': postgres.test_insert_many_performance,
+        'Update': postgres.test_update_performance,
+        'Delete': postgres.test_delete_performance,
+    }
+    for operation, test_func in operations.items():
+        plot_performance_comparison(
+            title=f'Postgres - {operation} Performance by Index Set',
+            results_list=[
+                [
+                    test_func(n=n, n_tests=n_tests,
+                              schema=functools.partial(postgres.create_postgres_schema, index_set=index_set))
+                    for n in scaling_stages
+                ]
+                for index_set in postgres.INDEX_SETS
+            ],
+            labels=[f'Postgres {operation} ({index_set})' for index_set in postgres.INDEX_SETS],
+            scaling_stages=scaling_stages
+        )
+
+
+def test_mongo_index_profiles() -> None:
+    scaling_stages = [1_000, 10_000, 100_000]
+    n_tests = 10
+    tests = {
+        f'MongoDB Read ({profile})': (mongo.test_read_performance, profile) for profile in mongo.INDEX_PROFILES
+    }
+    # The projected lookups only make a difference once an index can cover them.
+    tests['MongoDB Covered Read (none)'] = (mongo.test_read_covered_performance, 'none')
+    tests['MongoDB Covered Read (compound)'] = (mongo.test_read_covered_performance, 'compound')
+    plot_performance_comparison(
+        title='MongoDB - SongsInAPlaylist Aggregation Performance by Index Profile',
+        results_list=[
+            [
+                test_func(n=n, n_tests=n_tests, schema=functools.partial(mongo.create_mongo_indexes, profile=profile))
+                for n in scaling_stages
+            ]
+            for test_func, profile in tests.values()
+        ],
+        labels=list(tests),
+        scaling_stages=scaling_stages
+    )
+
+
+def test_document_models() -> None:
+    scaling_stages = [1_000, 10_000]
+    n_tests = 10
+    # Backend label -> module and the infix of its test names, e.g. postgres.test_read_document_performance.
+    backends = {
+        'MongoDB': (mongo, ''),
+        'Embedded MongoDB': (embedded_mongo, ''),
+        'Postgres': (postgres, ''),
+        'Postgres JSONB': (postgres, '_document'),
+    }
+    operations = {
+        'Read': 'read',
+        'Insert Many': 'insert_many',
+        'Update': 'update',
+        'Delete': 'delete',
+        'Playlist Push': 'playlist_push',
+        'Playlist Pull': 'playlist_pull',
+    }
+    for operation, test_name in operations.items():
+        plot_performance_comparison(
+            title=f'Relational vs Document Models - {operation} Performance Comparison',
+            results_list=[
+                [getattr(module, f'test_{test_name}{infix}_performance')(n=n, n_tests=n_tests) for n in scaling_stages]
+                for module, infix in backends.values()
+            ],
+            labels=[f'{backend} {operation}' for backend in backends],
+            scaling_stages=scaling_stages
+        )
+
+
+def test_embedded_sql() -> None:
+    scaling_stages = [1_000, 10_000, 100_000]
+    n_tests = 10
+    # Label -> module and the backend its tests run on, the embedded SQL tests are shared by SQLite and DuckDB.
+    embedded_labels = {'sqlite': 'SQLite', 'duckdb': 'DuckDB'}
+    backends = {'Postgres': (postgres, 'postgres')}
+    backends.update({embedded_labels[backend]: (embedded_sql, backend) for backend in embedded_sql.EMBEDDED_SQL_BACKENDS})
+    operations = {
+        'Read': 'read',
+        'Insert Many': 'insert_many',
+        'Update': 'update',
+        'Delete': 'delete',
+    }
+    for operation, test_name in operations.items():
+        results_list = []
+        for module, backend in backends.values():
+            test_func = getattr(module, f'test_{test_name}_performance')
+            if module is embedded_sql:
+                test_func = functools.partial(test_func, backend=backend)
+            results_list.append([test_func(n=n, n_tests=n_tests) for n in scaling_stages])
+        plot_performance_comparison(
+            title=f'Server vs Embedded SQL - {operation} Performance Comparison',
+            results_list=results_list,
+            labels=[f'{backend} {operation}' for backend in backends],
+            scaling_stages=scaling_stages
+        )
+
+
+def test_streaming() -> None:
+    n = 100_000
+    plot_streaming_results(
+        title='MongoDB vs Postgres - Streaming SongsInAPlaylist Reads by Batch Size',
+        results_list=[
+            mongo.mongo_streaming_test(mongo.stream_songs_in_a_playlist, init_func=mongo.insert_many_fake_data, n=n),
+            postgres.postgres_streaming_test(postgres.stream_songs_in_a_playlist,
+                                             init_func=postgres.copy_fake_data, n=n),
+        ],
+        labels=['MongoDB Aggregation Cursor', 'Postgres Server-Side Cursor'],
+    )
+
+
+EXPERIMENTS: dict[str, Callable[..., None]] = {
+    'inserts': test_inserts,
+    'reads': test_reads,
+    'deletes': test_deletes,
+    'updates': test_updates,
+    'reads_unique': test_reads_unique,
+    'insert_unique': test_insert_unique,
+    'bulk_inserts': test_bulk_inserts,
+    'concurrency': test_concurrency,
+    'async': test_async,
+    'materialized_view': test_materialized_view,
+    'index_matrix': test_index_matrix,
+    'mongo_index_profiles': test_mongo_index_profiles,
+    'document_models': test_document_models,
+    'embedded_sql': test_embedded_sql,
+    'streaming': test_streaming,
+}
+# Experiments that can measure every size in SWEEP_STAGES instead of extrapolating from n.
+SWEEP_EXPERIMENTS: set[str] = {'inserts', 'reads', 'deletes', 'updates', 'reads_unique', 'insert_unique'}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Run experiments one after another and plot their results.')
+    parser.add_argument('experiments', nargs='+', choices=EXPERIMENTS)
+    parser.add_argument('--sweep', action='store_true',
+                        help=f"Measure every size in SWEEP_STAGES ({', '.join(sorted(SWEEP_EXPERIMENTS))}).")
+    args = parser.parse_args()
+
+    # Generates the shared corpus once, so Faker never runs inside a timed section.
+    load_dataset(max(SCALING_STAGES))
+    for name in args.experiments:
+        if args.sweep and name in SWEEP_EXPERIMENTS:
+            EXPERIMENTS[name](sweep=True)
+        else:
+            EXPERIMENTS[name]()
+
+
 if __name__ == "__main__":
-    # test_inserts()
-    # test_reads()
-    # test_deletes()
-    # test_updates()
-    # test_reads_unique()
-    test_insert_unique()
\ No newline at end of file
+    main()
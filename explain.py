@@ -0,0 +1,123 @@
+from typing import Iterator, Optional
+
+# Keys under which a Mongo explain tree nests its input stages.
+MONGO_CHILD_STAGES: tuple[str, ...] = ('inputStage', 'inputStages', 'outerStage', 'innerStage', 'thenStage',
+                                       'elseStage')
+
+
+def _postgres_nodes(node: dict) -> Iterator[dict]:
+    yield node
+    for child in node.get('Plans', []):
+        yield from _postgres_nodes(child)
+
+
+def summarize_postgres_plan(plan: list[dict]) -> list[dict]:
+    """
+    One entry per node of an `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` plan.
+
+    `rows_examined` counts the rows a node produced plus those its filters removed, over all loops.
+    """
+    summary = []
+    for node in _postgres_nodes(plan[0]['Plan']):
+        loops = node.get('Actual Loops', 1)
+        removed = node.get('Rows Removed by Filter', 0) + node.get('Rows Removed by Join Filter', 0)
+        summary.append({
+            'stage': node['Node Type'],
+            'source': node.get('Relation Name'),
+            'index': node.get('Index Name'),
+            'collection_scan': node['Node Type'] == 'Seq Scan',
+            'rows_returned': node.get('Actual Rows', 0) * loops,
+            'rows_examined': (node.get('Actual Rows', 0) + removed) * loops,
+            # Sorts report their space type, hashes spill by splitting into batches.
+            'spilled_to_disk': node.get('Sort Space Type') == 'Disk' or node.get('Hash Batches', 1) > 1,
+            'shared_blocks_hit': node.get('Shared Hit Blocks', 0),
+            'shared_blocks_read': node.get('Shared Read Blocks', 0),
+        })
+    return summary
+
+
+def _mongo_nodes(stage: dict) -> Iterator[dict]:
+    yield stage
+    for key in MONGO_CHILD_STAGES:
+        children = stage.get(key)
+        if isinstance(children, dict):
+            yield from _mongo_nodes(children)
+        elif isinstance(children, list):
+            for child in children:
+                yield from _mongo_nodes(child)
+
+
+def _summarize_mongo_execution(execution_stages: dict) -> list[dict]:
+    return [
+        {
+            'stage': node['stage'],
+            'source': node.get('foreignCollection'),
+            'index': node.get('indexName'),
+            'collection_scan': node['stage'] == 'COLLSCAN' or node.get('strategy') in ('HashJoin', 'NestedLoopJoin'),
+            'rows_returned': node.get('nReturned', 0),
+            'rows_examined': node.get('docsExamined', 0),
+            'keys_examined': node.get('keysExamined', 0),
+            'spilled_to_disk': bool(node.get('usedDisk') or node.get('spills')),
+        }
+        for node in _mongo_nodes(execution_stages)
+    ]
+
+
+def _mongo_execution_stages(explain: dict) -> Optional[dict]:
+    execution_stats = explain.get('executionStats', {})
+    return execution_stats.get('executionStages')
+
+
+def summarize_mongo_explain(explain: dict) -> list[dict]:
+    """
+    One entry per stage of an aggregation explained with `executionStats` verbosity.
+
+    Pipelines the slot-based engine runs completely (lookups pushed down as EQ_LOOKUP) come back as a single
+    execution tree, the others as a `$cursor` stage followed by one entry per remaining pipeline stage.
+    """
+    if 'stages' not in explain:
+        execution_stages = _mongo_execution_stages(explain)
+        return _summarize_mongo_execution(execution_stages) if execution_stages else []
+
+    summary = []
+    for stage in explain['stages']:
+        (name, details), = ((key, value) for key, value in stage.items() if key.startswith('$'))
+        if name == '$cursor':
+            execution_stages = _mongo_execution_stages(details)
+            if execution_stages:
+                summary.extend(_summarize_mongo_execution(execution_stages))
+            continue
+        summary.append({
+            'stage': name,
+            'source': details.get('from') if isinstance(details, dict) else None,
+            'index': ', '.join(stage.get('indexesUsed', [])) or None,
+            'collection_scan': stage.get('collectionScans', 0) > 0,
+            'rows_returned': stage.get('nReturned', 0),
+            'rows_examined': stage.get('totalDocsExamined', 0),
+            'keys_examined': stage.get('totalKeysExamined', 0),
+            'spilled_to_disk': bool(stage.get('usedDisk') or stage.get('spills')),
+        })
+    return summary
+
+
+def summarize_sqlite_plan(rows: list[tuple]) -> list[dict]:
+    """
+    One entry per step of an SQLite `EXPLAIN QUERY PLAN` (rows of id, parent, notused, detail).
+
+    SQLite only reports the access path, so the row counts stay empty. A `USE TEMP B-TREE` step is the sort.
+    """
+    summary = []
+    for _, _, _, detail in rows:
+        words = detail.split()
+        access = words[0] in ('SCAN', 'SEARCH')
+        index = detail.split(' USING ', 1)[1].split(' (')[0] if access and ' USING ' in detail else None
+        summary.append({
+            'stage': words[0] if access else detail,
+            'source': words[1] if access and len(words) > 1 else None,
+            'index': index,
+            'collection_scan': words[0] == 'SCAN' and index is None,
+            'rows_returned': None,
+            'rows_examined': None,
+            'spilled_to_disk': None,
+        })
+    return summary
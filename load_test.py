@@ -0,0 +1,129 @@
+import inspect
+import threading
+import time
+from contextlib import AbstractContextManager
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from dataset import open_datasets
+
+CONCURRENCY_LEVELS: list[int] = [1, 2, 4, 8, 16, 32, 64]
+
+
+@dataclass
+class LoadResult:
+    clients: int
+    duration: float
+    latencies: list[float] = field(repr=False)
+    errors: int = 0
+
+    @property
+    def operations(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def throughput(self) -> float:
+        return self.operations / self.duration if self.duration else 0.0
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return float('nan')
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    @property
+    def p50(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def p95(self) -> float:
+        return self.percentile(95)
+
+    @property
+    def p99(self) -> float:
+        return self.percentile(99)
+
+
+def run_clients(
+        connect: Callable[[], AbstractContextManager],
+        test_func: Callable,
+        clients: int,
+        duration: float,
+        *args,
+        **kwargs
+) -> LoadResult:
+    """
+    Runs `test_func` in a closed loop on `clients` threads for `duration` seconds.
+
+    Every thread opens its own connection through `connect`, so no driver-level connection is shared.
+    All threads connect first and start issuing operations together.
+    """
+    test_func = inspect.unwrap(test_func)
+    latencies: list[list[float]] = [[] for _ in range(clients)]
+    errors = [0] * clients
+    deadline: list[float] = []
+    # The deadline is only set once every client is connected, so connection setup never eats into `duration`.
+    start_barrier = threading.Barrier(clients + 1, action=lambda: deadline.append(time.perf_counter() + duration))
+
+    def worker(i: int) -> None:
+        try:
+            with connect() as db:
+                start_barrier.wait()
+                own_latencies = latencies[i]
+                while time.perf_counter() < deadline[0]:
+                    start = time.perf_counter()
+                    try:
+                        test_func(db, *args, **kwargs)
+                    except Exception:
+                        errors[i] += 1
+                        if hasattr(db, 'rollback'):
+                            db.rollback()
+                        continue
+                    own_latencies.append(time.perf_counter() - start)
+        except threading.BrokenBarrierError:
+            return
+        except Exception:
+            start_barrier.abort()
+            raise
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = LoadResult(
+        clients=clients, duration=elapsed, latencies=[t for own in latencies for t in own], errors=sum(errors)
+    )
+    print(f"'{test_func.__name__}' - {clients} clients: {result.throughput:.1f} ops/s, "
+          f"p50 {result.p50 * 1000:.2f} ms, p95 {result.p95 * 1000:.2f} ms, p99 {result.p99 * 1000:.2f} ms, "
+          f"{result.errors} errors")
+    return result
+
+
+def measure_load(
+        db,
+        connect: Callable[[], AbstractContextManager],
+        test_func: Callable,
+        init_func: Optional[Callable] = None,
+        concurrency_levels: Optional[list[int]] = None,
+        duration: float = 10.0,
+        *args,
+        **kwargs
+) -> list[LoadResult]:
+    """Seeds `db` once with `init_func` and runs `test_func` at every concurrency level."""
+    init_func_n = None
+    if init_func:
+        init_func_n = kwargs.pop('init_func_n', kwargs.pop('n', 1000))
+    open_datasets(init_func_n, kwargs.get('n'))
+    if init_func:
+        print(f"Applying init function: {init_func.__name__}(n={init_func_n})")
+        init_func(db, n=init_func_n)
+
+    return [
+        run_clients(connect, test_func, clients, duration, *args, **kwargs)
+        for clients in concurrency_levels or CONCURRENCY_LEVELS
+    ]
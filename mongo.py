@@ -1,41 +1,212 @@
-import functools
-from contextlib import contextmanager
-from typing import Callable, Optional
+from typing import Callable, Iterator, Optional
 
 import pymongo
-from faker import Faker
 from pymongo.database import Database
-from testcontainers.mongodb import MongoDbContainer
 from bson.decimal128 import Decimal128
 
-from performance_test import measure_performance
+from backends import Backend, load_test, performance_test, pool, register_backend, streaming_test
+from dataset import load_dataset
+from explain import summarize_mongo_explain
+from load_test import LoadResult
+from resources import ResourceProbe
+from streaming_test import StreamingResult
 
-faker: Faker = Faker()
+
+SONGS_IN_A_PLAYLIST_PIPELINE: list[dict] = [
+    {
+        "$lookup": {
+            "from": "songs_playlists",
+            "localField": "_id",
+            "foreignField": "song_id",
+            "as": "playlist_info"
+        }
+    },
+    {
+        "$unwind": "$playlist_info"
+    },
+    {
+        "$lookup": {
+            "from": "playlists",
+            "localField": "playlist_info.playlist_id",
+            "foreignField": "_id",
+            "as": "playlist"
+        }
+    },
+    {
+        "$unwind": "$playlist"
+    },
+    {
+        "$lookup": {
+            "from": "artists_albums",
+            "localField": "album_id",
+            "foreignField": "album_id",
+            "as": "artist_album"
+        }
+    },
+    {
+        "$unwind": "$artist_album"
+    },
+    {
+        "$lookup": {
+            "from": "artists",
+            "localField": "artist_album.artist_id",
+            "foreignField": "_id",
+            "as": "artist"
+        }
+    },
+    {
+        "$unwind": "$artist"
+    },
+    {
+        "$project": {
+            "playlist_id": "$playlist._id",
+            "playlist_name": "$playlist.name",
+            "song_id": "$_id",
+            "song_title": "$title",
+            "song_length": "$length",
+            "song_rating": "$rating",
+            "yt_link": "$yt_link",
+            "artist_id": "$artist._id",
+            "artist_name": "$artist.name",
+            "album_id": "$album_id",
+        }
+    }
+]
+
+FAKE_DATA_COLLECTIONS: tuple[str, ...] = ("artists", "albums", "songs", "playlists", "artists_albums", "songs_playlists")
+
+# Fields the join collections hold, in the order of their lookup in SONGS_IN_A_PLAYLIST_PIPELINE.
+JOIN_COLLECTION_FIELDS: dict[str, tuple[str, str]] = {
+    "songs_playlists": ("song_id", "playlist_id"),
+    "artists_albums": ("album_id", "artist_id"),
+}
+
+# Secondary indexes on the `foreignField`s of SONGS_IN_A_PLAYLIST_PIPELINE, per collection. The lookups into
+# playlists and artists go through `_id`, which is always indexed.
+INDEX_PROFILES: dict[str, dict[str, list[list[tuple[str, int]]]]] = {
+    'none': {},
+    'single_field': {
+        collection: [[(lookup_field, pymongo.ASCENDING)]]
+        for collection, (lookup_field, _) in JOIN_COLLECTION_FIELDS.items()
+    },
+    # Also carries the field the next lookup continues with, which lets the covered pipeline below answer both
+    # join collections from the index alone.
+    'compound': {
+        collection: [[(lookup_field, pymongo.ASCENDING), (next_field, pymongo.ASCENDING)]]
+        for collection, (lookup_field, next_field) in JOIN_COLLECTION_FIELDS.items()
+    },
+}
+
+
+def covered_lookups(pipeline: list[dict]) -> list[dict]:
+    """
+    Copy of `pipeline` whose lookups into the join collections only project the indexed fields without `_id`,
+    so with the 'compound' profile they are covered by the index and never fetch the documents.
+    """
+    covered = []
+    for stage in pipeline:
+        lookup = stage.get("$lookup")
+        if lookup and lookup["from"] in JOIN_COLLECTION_FIELDS:
+            projection = {"_id": 0, **{field: 1 for field in JOIN_COLLECTION_FIELDS[lookup["from"]]}}
+            stage = {"$lookup": {**lookup, "pipeline": [{"$project": projection}]}}
+        covered.append(stage)
+    return covered
+
+
+SONGS_IN_A_PLAYLIST_COVERED_PIPELINE: list[dict] = covered_lookups(SONGS_IN_A_PLAYLIST_PIPELINE)
+
+
+def mongo_performance_test(init_func: Optional[Callable] = None, schema: Optional[Callable] = None,
+                           setup_func: Optional[Callable] = None, teardown_func: Optional[Callable] = None,
+                           backend: str = 'mongo', explain: Optional[tuple[str, list[dict]]] = None):
+    """
+    `backends.performance_test` on a Mongo backend.
+
+    :param backend: Registered backend to run on, e.g. 'mongo-embedded' for the embedded document model.
+    :param explain: Collection and pipeline of the aggregation the decorated function runs, captured with
+        `explain("executionStats")`.
+    """
+    return performance_test(backend, init_func, schema, setup_func, teardown_func, explain)
+
+
+def explain_mongo_aggregation(mongo_db: Database, collection: str, pipeline: list[dict]) -> dict:
+    """Explains the aggregation with `executionStats` verbosity and summarizes every stage."""
+    explanation = mongo_db.command({
+        "explain": {"aggregate": collection, "pipeline": pipeline, "cursor": {}},
+        "verbosity": "executionStats",
+    })
+    return {'raw': explanation, 'summary': summarize_mongo_explain(explanation)}
+
+
+def mongo_server_counters(mongo_db: Database) -> dict:
+    """Cumulative WiredTiger cache, query executor and operation counters from serverStatus."""
+    status = mongo_db.command('serverStatus')
+    cache = status['wiredTiger']['cache']
+    return {
+        'documents_examined': status['metrics']['queryExecutor']['scannedObjects'],
+        'keys_examined': status['metrics']['queryExecutor']['scanned'],
+        'cache': {
+            'bytes_read_into_cache': cache['bytes read into cache'],
+            'bytes_written_from_cache': cache['bytes written from cache'],
+            'pages_read_into_cache': cache['pages read into cache'],
+            'bytes_currently_in_cache': cache['bytes currently in the cache'],
+        },
+        'opcounters': dict(status['opcounters']),
+    }
 
 
-def mongo_performance_test(init_func: Optional[Callable] = None):
-    @contextmanager
-    def mongo_context():
-        mongo = MongoDbContainer()
-        mongo.start()
-        connection_string = mongo.get_connection_url()
-        mongo_client = pymongo.MongoClient(connection_string)
-        db = mongo_client["DBIMusicPlayer"]  # Adjust the database name as needed
-        try:
-            yield db
-        finally:
-            mongo_client.close()
-            mongo.stop()
+def mongo_storage_sizes(mongo_db: Database) -> dict:
+    """
+    Data, storage and index bytes per collection and of the whole database, both without reseed snapshots.
 
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, n_tests: int = 10, **kwargs):
-            with mongo_context() as db:
-                return measure_performance(db=db, test_func=func, init_func=init_func, n_tests=n_tests, *args, **kwargs)
+    The database totals are db.stats minus the snapshot collections, which hold a full copy of the seeded data.
+    """
+    sizes = {}
+    snapshots = {'data': 0, 'storage': 0, 'indexes': 0}
+    for name in mongo_db.list_collection_names():
+        stats = next(mongo_db[name].aggregate([{"$collStats": {"storageStats": {}}}]))['storageStats']
+        collection_sizes = {'data': stats['size'], 'storage': stats['storageSize'], 'indexes': stats['totalIndexSize']}
+        if '_snapshot_' in name:
+            for key, size in collection_sizes.items():
+                snapshots[key] += size
+            continue
+        sizes[name] = collection_sizes
+    db_stats = mongo_db.command('dbStats')
+    sizes['_database'] = {'data': db_stats['dataSize'] - snapshots['data'],
+                          'storage': db_stats['storageSize'] - snapshots['storage'],
+                          'indexes': db_stats['indexSize'] - snapshots['indexes']}
+    return sizes
 
-        return wrapper
 
-    return decorator
+MONGO_RESOURCE_PROBE = ResourceProbe(counters=mongo_server_counters, sizes=mongo_storage_sizes)
+
+register_backend(Backend(
+    name='mongo',
+    session=pool.mongo,
+    connect=pool.connect_mongo,
+    metadata=lambda mongo_db: {'server_version': mongo_db.client.server_info()['version']},
+    resource_probe=MONGO_RESOURCE_PROBE,
+    explain=lambda mongo_db, aggregation: explain_mongo_aggregation(mongo_db, *aggregation),
+))
+
+
+def mongo_load_test(test_func: Callable, init_func: Optional[Callable] = None, schema: Optional[Callable] = None,
+                    **kwargs) -> list[LoadResult]:
+    """Runs `test_func` with 1..64 concurrent clients, each with its own MongoClient, see `load_test.measure_load`."""
+    return load_test('mongo', test_func, init_func, schema, **kwargs)
+
+
+def mongo_streaming_test(stream_func: Callable, init_func: Optional[Callable] = None,
+                         schema: Optional[Callable] = None, **kwargs) -> list[StreamingResult]:
+    """Streams the result of `stream_func` at every batch size, see `streaming_test.measure_streaming`."""
+    return streaming_test('mongo', stream_func, init_func, schema, **kwargs)
+
+
+def create_mongo_indexes(mongo_db: Database, profile: str = 'none') -> None:
+    """Creates the secondary indexes of `profile` from INDEX_PROFILES on the empty collections."""
+    for collection, indexes in INDEX_PROFILES[profile].items():
+        for keys in indexes:
+            mongo_db[collection].create_index(keys)
 
 
 def init_mongo_db(mongo_db: Database) -> None:
@@ -44,19 +215,26 @@ def init_mongo_db(mongo_db: Database) -> None:
     collection.insert_many([{"number": i} for i in range(1000)])
 
 
+def to_decimal128(value: float, digits: int) -> Decimal128:
+    return Decimal128(f"{value:.{digits}f}")
+
+
 def insert_fake_data(mongo_db: Database, n: int) -> None:
-    for _ in range(n):
-        artist_id = mongo_db.artists.insert_one({"name": faker.name()}).inserted_id
-        album_id = mongo_db.albums.insert_one({"name": faker.word()}).inserted_id
+    data = load_dataset(n)
+    for artist_name, album_name, playlist_name, song_title, song_length, song_rating, yt_link in data.rows(
+            n, 'artist_name', 'album_name', 'playlist_name', 'song_title', 'song_length', 'song_rating',
+            'song_yt_link'):
+        artist_id = mongo_db.artists.insert_one({"name": artist_name}).inserted_id
+        album_id = mongo_db.albums.insert_one({"name": album_name}).inserted_id
         song_id = mongo_db.songs.insert_one({
-            "title": faker.sentence(),
-            "length": Decimal128(faker.pydecimal(left_digits=2, right_digits=2, positive=True)),
-            "rating": Decimal128(faker.pydecimal(left_digits=1, right_digits=1, positive=True)),
-            "yt_link": faker.url(),
+            "title": song_title,
+            "length": to_decimal128(song_length, 2),
+            "rating": to_decimal128(song_rating, 1),
+            "yt_link": yt_link,
             "artist_id": artist_id,
             "album_id": album_id
         }).inserted_id
-        playlist_id = mongo_db.playlists.insert_one({"name": faker.catch_phrase()}).inserted_id
+        playlist_id = mongo_db.playlists.insert_one({"name": playlist_name}).inserted_id
         mongo_db.artists_albums.insert_one({
             "artist_id": artist_id,
             "album_id": album_id
@@ -68,32 +246,76 @@ def insert_fake_data(mongo_db: Database, n: int) -> None:
 
 
 def insert_many_fake_data(mongo_db: Database, n: int) -> None:
-    artists_data = [{"name": faker.name()} for _ in range(n)]
-    albums_data = [{"name": faker.word()} for _ in range(n)]
-    playlists_data = [{"name": faker.word()} for _ in range(n)]
-    artists = mongo_db.artists.insert_many(artists_data).inserted_ids
-    albums = mongo_db.albums.insert_many(albums_data).inserted_ids
-    playlists = mongo_db.playlists.insert_many(playlists_data).inserted_ids
-    songs_data = [
+    data = load_dataset(n)
+    artists = mongo_db.artists.insert_many({"name": name} for name in data.column(n, 'artist_name')).inserted_ids
+    albums = mongo_db.albums.insert_many({"name": name} for name in data.column(n, 'album_name')).inserted_ids
+    playlists = mongo_db.playlists.insert_many(
+        {"name": name} for name in data.column(n, 'playlist_name')).inserted_ids
+    songs_data = (
         {
-            "title": faker.sentence(),
-            "length": Decimal128(faker.pydecimal(left_digits=2, right_digits=2, positive=True)),
-            "rating": Decimal128(faker.pydecimal(left_digits=1, right_digits=1, positive=True)),
-            "yt_link": faker.url(),
-            "artist_id": artists[i % n],
-            "album_id": albums[i % n],
+            "title": title,
+            "length": to_decimal128(length, 2),
+            "rating": to_decimal128(rating, 1),
+            "yt_link": yt_link,
+            "artist_id": artists[artist],
+            "album_id": albums[album],
         }
-        for i in range(n)
-    ]
+        for title, length, rating, yt_link, artist, album in data.rows(
+            n, 'song_title', 'song_length', 'song_rating', 'song_yt_link', 'song_artist', 'song_album')
+    )
     songs = mongo_db.songs.insert_many(songs_data).inserted_ids
-    album_artist_data = [{"artist_id": artist_id, "album_id": album_id} for artist_id, album_id in zip(artists, albums)]
-    playlist_song_data = [
-        {"song_id": song_id, "playlist_id": playlist_id} for song_id, playlist_id in zip(songs, playlists)
-    ]
+    album_artist_data = (
+        {"artist_id": artists[artist], "album_id": albums[album]}
+        for album, artist in data.rows(n, 'album_artist_album', 'album_artist_artist')
+    )
+    playlist_song_data = (
+        {"song_id": songs[song], "playlist_id": playlists[playlist]}
+        for playlist, song in data.rows(n, 'playlist_song_playlist', 'playlist_song_song')
+    )
     mongo_db.artists_albums.insert_many(album_artist_data)
     mongo_db.songs_playlists.insert_many(playlist_song_data)
 
 
+def reseed_collections(mongo_db: Database, n: int, loader: Callable[[Database, int], None],
+                       collections: tuple[str, ...]) -> None:
+    """
+    Restores `collections` to the first `n` dataset rows from a server-side snapshot.
+
+    The snapshot is bulk loaded with `loader` and copied with `$out` on first use, later calls copy it back with
+    `$out`, which keeps the indexes of the target collections and never sends the documents over the wire again.
+    """
+    suffix = f"_snapshot_{n}"
+    # The snapshot of the last collection is written last, so it only exists once the snapshot is complete.
+    if f"{collections[-1]}{suffix}" in mongo_db.list_collection_names():
+        for name in collections:
+            mongo_db[name + suffix].aggregate([{"$out": name}])
+        return
+
+    for name in collections:
+        mongo_db[name].delete_many({})
+    loader(mongo_db, n)
+    for name in collections:
+        mongo_db[name].aggregate([{"$out": name + suffix}])
+
+
+def reseed_fake_data(mongo_db: Database, n: int) -> None:
+    reseed_collections(mongo_db, n, insert_many_fake_data, FAKE_DATA_COLLECTIONS)
+
+
+def stream_songs_in_a_playlist(mongo_db: Database, batch_size: Optional[int]) -> Iterator[dict]:
+    """
+    Iterates the SongsInAPlaylist aggregation `batch_size` documents per getMore, with `allowDiskUse` so the
+    server may spill instead of failing on large intermediate results.
+
+    With `batch_size=None` the whole result is read into a list first, like `test_read_performance`.
+    """
+    if batch_size is None:
+        yield from list(mongo_db.songs.aggregate(SONGS_IN_A_PLAYLIST_PIPELINE))
+        return
+    with mongo_db.songs.aggregate(SONGS_IN_A_PLAYLIST_PIPELINE, batchSize=batch_size, allowDiskUse=True) as cursor:
+        yield from cursor
+
+
 @mongo_performance_test()
 def test_insert_performance(mongo_db: Database, n: int) -> None:
     insert_fake_data(mongo_db, n)
@@ -104,73 +326,13 @@ def test_insert_many_performance(mongo_db: Database, n: int) -> None:
     insert_many_fake_data(mongo_db, n)
 
 
-@mongo_performance_test(init_func=insert_many_fake_data)
+@mongo_performance_test(init_func=insert_many_fake_data, explain=("songs", SONGS_IN_A_PLAYLIST_PIPELINE))
 def test_read_performance(mongo_db: Database) -> None:
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "songs_playlists",
-                "localField": "_id",
-                "foreignField": "song_id",
-                "as": "playlist_info"
-            }
-        },
-        {
-            "$unwind": "$playlist_info"
-        },
-        {
-            "$lookup": {
-                "from": "playlists",
-                "localField": "playlist_info.playlist_id",
-                "foreignField": "_id",
-                "as": "playlist"
-            }
-        },
-        {
-            "$unwind": "$playlist"
-        },
-        {
-            "$lookup": {
-                "from": "artists_albums",
-                "localField": "album_id",
-                "foreignField": "album_id",
-                "as": "artist_album"
-            }
-        },
-        {
-            "$unwind": "$artist_album"
-        },
-        {
-            "$lookup": {
-                "from": "artists",
-                "localField": "artist_album.artist_id",
-                "foreignField": "_id",
-                "as": "artist"
-            }
-        },
-        {
-            "$unwind": "$artist"
-        },
-        {
-            "$project": {
-                "playlist_id": "$playlist._id",
-                "playlist_name": "$playlist.name",
-                "song_id": "$_id",
-                "song_title": "$title",
-                "song_length": "$length",
-                "song_rating": "$rating",
-                "yt_link": "$yt_link",
-                "artist_id": "$artist._id",
-                "artist_name": "$artist.name",
-                "album_id": "$album_id",
-            }
-        }
-    ]
-    songs_in_playlist = mongo_db.songs.aggregate(pipeline)
+    songs_in_playlist = mongo_db.songs.aggregate(SONGS_IN_A_PLAYLIST_PIPELINE)
     _ = list(songs_in_playlist)
 
 
-@mongo_performance_test(init_func=insert_many_fake_data)
+@mongo_performance_test(setup_func=reseed_fake_data)
 def test_delete_performance(mongo_db: Database) -> None:
     mongo_db.artists.delete_many({})
     mongo_db.albums.delete_many({})
@@ -180,12 +342,34 @@ def test_delete_performance(mongo_db: Database) -> None:
     mongo_db.songs_playlists.delete_many({})
 
 
-@mongo_performance_test(init_func=insert_many_fake_data)
+@mongo_performance_test(setup_func=reseed_fake_data)
 def test_update_performance(mongo_db: Database) -> None:
     mongo_db.artists.update_many({}, {"$set": {"name": "Updated Artist Name"}})
     mongo_db.songs.update_many({}, {"$set": {"length": Decimal128("3.50")}})
 
 
+@mongo_performance_test(init_func=insert_many_fake_data, explain=("songs", SONGS_IN_A_PLAYLIST_COVERED_PIPELINE))
+def test_read_covered_performance(mongo_db: Database) -> None:
+    songs_in_playlist = mongo_db.songs.aggregate(SONGS_IN_A_PLAYLIST_COVERED_PIPELINE)
+    _ = list(songs_in_playlist)
+
+
+@mongo_performance_test(setup_func=reseed_fake_data)
+def test_playlist_push_performance(mongo_db: Database, n_ops: int = 100) -> None:
+    """Adds the i-th song to the i-th playlist for the first `n_ops` of each, one write each."""
+    playlist_ids = [playlist["_id"] for playlist in mongo_db.playlists.find({}, {"_id": 1}).limit(n_ops)]
+    song_ids = [song["_id"] for song in mongo_db.songs.find({}, {"_id": 1}).limit(n_ops)]
+    for playlist_id, song_id in zip(playlist_ids, song_ids):
+        mongo_db.songs_playlists.insert_one({"song_id": song_id, "playlist_id": playlist_id})
+
+
+@mongo_performance_test(setup_func=reseed_fake_data)
+def test_playlist_pull_performance(mongo_db: Database, n_ops: int = 100) -> None:
+    """Removes the first `n_ops` playlist entries, one write each."""
+    for entry in list(mongo_db.songs_playlists.find({}, {"_id": 1}).limit(n_ops)):
+        mongo_db.songs_playlists.delete_one({"_id": entry["_id"]})
+
+
 def insert_many_unique(mongo_db, n) -> None:
     insert_many_fake_data(mongo_db, n)
     mongo_db.songs.create_index([("yt_link", pymongo.ASCENDING)], unique=True)
@@ -196,67 +380,7 @@ def test_unique_insert_performance(mongo_db: Database, n) -> None:
     insert_fake_data(mongo_db, n)
 
 
-@mongo_performance_test(init_func=insert_many_unique)
+@mongo_performance_test(init_func=insert_many_unique, explain=("songs", SONGS_IN_A_PLAYLIST_PIPELINE))
 def test_unique_read_performance(mongo_db) -> None:
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "songs_playlists",
-                "localField": "_id",
-                "foreignField": "song_id",
-                "as": "playlist_info"
-            }
-        },
-        {
-            "$unwind": "$playlist_info"
-        },
-        {
-            "$lookup": {
-                "from": "playlists",
-                "localField": "playlist_info.playlist_id",
-                "foreignField": "_id",
-                "as": "playlist"
-            }
-        },
-        {
-            "$unwind": "$playlist"
-        },
-        {
-            "$lookup": {
-                "from": "artists_albums",
-                "localField": "album_id",
-                "foreignField": "album_id",
-                "as": "artist_album"
-            }
-        },
-        {
-            "$unwind": "$artist_album"
-        },
-        {
-            "$lookup": {
-                "from": "artists",
-                "localField": "artist_album.artist_id",
-                "foreignField": "_id",
-                "as": "artist"
-            }
-        },
-        {
-            "$unwind": "$artist"
-        },
-        {
-            "$project": {
-                "playlist_id": "$playlist._id",
-                "playlist_name": "$playlist.name",
-                "song_id": "$_id",
-                "song_title": "$title",
-                "song_length": "$length",
-                "song_rating": "$rating",
-                "yt_link": "$yt_link",
-                "artist_id": "$artist._id",
-                "artist_name": "$artist.name",
-                "album_id": "$album_id",
-            }
-        }
-    ]
-    songs_in_playlist = mongo_db.songs.aggregate(pipeline)
+    songs_in_playlist = mongo_db.songs.aggregate(SONGS_IN_A_PLAYLIST_PIPELINE)
     _ = list(songs_in_playlist)
@@ -0,0 +1,176 @@
+import argparse
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from backends import BACKENDS
+from dataset import load_dataset
+from results_store import ResultsStore
+
+# Experiments are the operations the backend modules share a test for, e.g. 'read' -> test_read_performance.
+EXPERIMENTS: list[str] = ['read', 'insert', 'insert_many', 'update', 'delete', 'playlist_push', 'playlist_pull']
+
+# Registered backend name -> module holding its tests and the keyword arguments that select the backend.
+BACKEND_MODULES: dict[str, tuple[str, dict]] = {
+    'postgres': ('postgres', {}),
+    'mongo': ('mongo', {}),
+    'mongo-embedded': ('embedded_mongo', {}),
+    'postgres-asyncpg': ('async_postgres', {}),
+    'mongo-motor': ('async_mongo', {}),
+    'sqlite': ('embedded_sql', {}),
+    'duckdb': ('embedded_sql', {'backend': 'duckdb'}),
+}
+
+DEFAULT_SIZES: list[int] = [1_000, 10_000, 100_000]
+
+
+@dataclass(frozen=True)
+class Job:
+    experiment: str
+    backend: str
+    n: int
+    n_tests: int
+
+    @property
+    def key(self) -> str:
+        """Identifies the job within a run, finished keys are skipped when the run is resumed."""
+        return f"{self.experiment}/{self.backend}/n={self.n}/n_tests={self.n_tests}"
+
+
+def plan_jobs(experiments: list[str], backends: list[str], sizes: list[int], n_tests: int) -> list[Job]:
+    """One job per experiment, backend and size, skipping backends that have no test for the experiment."""
+    jobs = []
+    for experiment in experiments:
+        for backend in backends:
+            module_name, _ = BACKEND_MODULES[backend]
+            module = importlib.import_module(module_name)
+            if backend not in BACKENDS:
+                raise ValueError(f"Backend '{backend}' is not available, its driver is probably not installed")
+            if not hasattr(module, f'test_{experiment}_performance'):
+                continue
+            jobs.extend(Job(experiment, backend, n, n_tests) for n in sizes)
+    # Largest jobs first, so a long job doesn't start last and keep the other workers idle.
+    return sorted(jobs, key=lambda job: job.n, reverse=True)
+
+
+def partition_cpus(cpus: list[int], workers: int) -> list[tuple[list[int], list[int]]]:
+    """
+    Splits `cpus` into one disjoint (client, container) pair of CPU sets per worker.
+
+    The benchmark process of a worker runs on the first half of its share, its containers on the second half.
+    """
+    share = len(cpus) // workers
+    if share < 2:
+        raise ValueError(f"{len(cpus)} CPUs are not enough to isolate {workers} workers, each needs at least 2")
+    slots = []
+    for i in range(workers):
+        worker_cpus = cpus[i * share:(i + 1) * share]
+        slots.append((worker_cpus[:share // 2], worker_cpus[share // 2:]))
+    return slots
+
+
+def available_cpus() -> list[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _init_worker(slots, container_memory: Optional[str]) -> None:
+    """Takes a free CPU slot, pins this worker process to it and its future containers to the other half."""
+    from backends import pool
+
+    if container_memory:
+        pool.container_kwargs['mem_limit'] = container_memory
+    slot = slots.get()
+    if slot is None:
+        return
+    client_cpus, container_cpus = slot
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, client_cpus)
+    pool.container_kwargs['cpuset_cpus'] = ','.join(map(str, container_cpus))
+    print(f"Worker {os.getpid()}: client CPUs {client_cpus}, container CPUs {container_cpus}")
+
+
+def run_job(job: Job) -> Job:
+    """Runs a job in the current worker, against the containers this worker started."""
+    module_name, kwargs = BACKEND_MODULES[job.backend]
+    test_func = getattr(importlib.import_module(module_name), f'test_{job.experiment}_performance')
+    test_func(n=job.n, n_tests=job.n_tests, **kwargs)
+    return job
+
+
+def run_jobs(jobs: list[Job], workers: int, store: ResultsStore, container_memory: Optional[str] = None,
+             isolate: bool = True) -> list[Job]:
+    """
+    Runs the jobs of `store.run_id` that have not finished yet on `workers` processes and returns the failed ones.
+
+    Every worker keeps its own warm containers for all the jobs it runs (see `backends.BackendPool`). With `isolate`,
+    each worker and its containers are pinned to CPUs no other worker uses. A job is marked finished once its result
+    is stored, so restarting with the same run id resumes where the previous attempt stopped.
+    """
+    finished = store.finished_jobs()
+    pending = [job for job in jobs if job.key not in finished]
+    print(f"Run {store.run_id}: {len(jobs) - len(pending)} of {len(jobs)} jobs already finished")
+    if not pending:
+        return []
+
+    # Workers inherit the run id, so all their results land in the same run.
+    os.environ['BENCHMARK_RUN_ID'] = store.run_id
+    # Generates the shared corpus once, so the workers don't race to write it and Faker never runs in a job.
+    load_dataset(max(job.n for job in pending))
+
+    # Spawned workers exit through sys.exit, which runs the atexit hook that stops their containers.
+    context = multiprocessing.get_context('spawn')
+    slots = context.Queue()
+    for slot in partition_cpus(available_cpus(), workers) if isolate else [None] * workers:
+        slots.put(slot)
+
+    failed = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(slots, container_memory)) as executor:
+        futures = {executor.submit(run_job, job): job for job in pending}
+        for i, future in enumerate(as_completed(futures), start=1):
+            job = futures[future]
+            try:
+                future.result()
+            except Exception as error:
+                failed.append(job)
+                print(f"[{i}/{len(pending)}] {job.key} failed: {error!r}")
+                continue
+            store.mark_job_finished(job.key)
+            print(f"[{i}/{len(pending)}] {job.key} finished after {time.perf_counter() - start:.0f} s")
+    return failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Run (experiment, backend, size) jobs in parallel, each worker on its own CPUs and containers.')
+    parser.add_argument('--experiments', nargs='+', choices=EXPERIMENTS, default=EXPERIMENTS)
+    parser.add_argument('--backends', nargs='+', choices=BACKEND_MODULES, default=['postgres', 'mongo'])
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--n-tests', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=max(len(available_cpus()) // 4, 1),
+                        help='Parallel workers, each gets an equal share of at least 2 of the available CPUs.')
+    parser.add_argument('--no-isolation', dest='isolate', action='store_false',
+                        help='Let workers and containers share all CPUs, e.g. on machines with few cores.')
+    parser.add_argument('--container-memory', help='Memory limit of every container, e.g. 4g.')
+    parser.add_argument('--run-id', default=os.environ.get('BENCHMARK_RUN_ID'),
+                        help='Run to record into. Pass the id of an interrupted run to resume it.')
+    args = parser.parse_args()
+
+    store = ResultsStore(run_id=args.run_id or datetime.now().strftime('%Y%m%dT%H%M%S'))
+    jobs = plan_jobs(args.experiments, args.backends, args.sizes, args.n_tests)
+    failed = run_jobs(jobs, args.workers, store, args.container_memory, args.isolate)
+    if failed:
+        print(f"{len(failed)} jobs failed, rerun with --run-id {store.run_id} to retry them")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
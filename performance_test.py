@@ -1,12 +1,104 @@
+import asyncio
+import dataclasses
+import functools
+import gc
+import math
+import time
 import typing
+from array import array
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass, field
 from statistics import mean, stdev
-from timeit import Timer
-from typing import Callable
+from typing import Awaitable, Callable
 
 import psycopg2.extensions
 import pymongo.database
 from tqdm import tqdm
 
+from dataset import open_datasets
+from resources import ResourceProbe
+
+
+@dataclass
+class BenchmarkResult:
+    """Raw per-iteration timings of one test run plus the statistics derived from them (in seconds)."""
+    name: str
+    samples_ns: array = field(repr=False)
+    warmup: int = 0
+    gc_disabled: bool = False
+    backend: str = ''
+    # Data size the test ran against (`init_func_n` / `n`) and the remaining test arguments.
+    n: typing.Optional[int] = None
+    params: dict = field(default_factory=dict)
+    # Environment details only known to the backend, e.g. the server version.
+    metadata: dict = field(default_factory=dict)
+    # Client memory, server counter deltas and on-disk sizes of one extra untimed call, see `ResourceProbe`.
+    resources: dict = field(default_factory=dict)
+    # Query plan of the measured read (`raw` plan and per-stage `summary`), captured once per data size.
+    plan: dict = field(default_factory=dict)
+
+    @functools.cached_property
+    def _sorted(self) -> list[int]:
+        return sorted(self.samples_ns)
+
+    @property
+    def samples(self) -> list[float]:
+        return [sample / 1e9 for sample in self.samples_ns]
+
+    @property
+    def n_samples(self) -> int:
+        return len(self.samples_ns)
+
+    @property
+    def mean(self) -> float:
+        return mean(self.samples_ns) / 1e9 if self.samples_ns else math.nan
+
+    @property
+    def std(self) -> float:
+        return stdev(self.samples_ns) / 1e9 if len(self.samples_ns) > 1 else 0.0
+
+    @property
+    def min(self) -> float:
+        return self._sorted[0] / 1e9 if self.samples_ns else math.nan
+
+    @property
+    def max(self) -> float:
+        return self._sorted[-1] / 1e9 if self.samples_ns else math.nan
+
+    def percentile(self, p: float) -> float:
+        """Linearly interpolated percentile, `p` in [0, 100]."""
+        if not self.samples_ns:
+            return math.nan
+        position = (len(self._sorted) - 1) * p / 100
+        lower, upper = math.floor(position), math.ceil(position)
+        value = self._sorted[lower] + (self._sorted[upper] - self._sorted[lower]) * (position - lower)
+        return value / 1e9
+
+    @property
+    def median(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def iqr(self) -> float:
+        return self.percentile(75) - self.percentile(25)
+
+    @property
+    def outliers(self) -> int:
+        """Number of samples outside the Tukey fences (1.5 IQR below Q1 or above Q3)."""
+        low, high = self.percentile(25) - 1.5 * self.iqr, self.percentile(75) + 1.5 * self.iqr
+        return sum(1 for sample in self.samples_ns if not low <= sample / 1e9 <= high)
+
+    def scaled(self, factor: float) -> 'BenchmarkResult':
+        """Returns a copy with every sample multiplied by `factor`, used for linear extrapolation."""
+        return dataclasses.replace(
+            self, samples_ns=array('Q', (round(sample * factor) for sample in self.samples_ns))
+        )
+
+    def summary(self) -> str:
+        return (f"'{self.name}' - Mean: {self.mean:.4f} s, Std Dev: {self.std:.4f} s, Min: {self.min:.4f} s, "
+                f"Median: {self.median:.4f} s, p95: {self.percentile(95):.4f} s, p99: {self.percentile(99):.4f} s, "
+                f"IQR: {self.iqr:.4f} s, Outliers: {self.outliers}/{self.n_samples}")
+
 
 def measure_performance(
         db: pymongo.database.Database | psycopg2.extensions.connection,
@@ -14,22 +106,149 @@ def measure_performance(
         n_tests: int,
         init_func: typing.Optional[Callable] = None,
         *args,
+        setup_func: typing.Optional[Callable] = None,
+        teardown_func: typing.Optional[Callable] = None,
+        warmup: int = 0,
+        disable_gc: bool = False,
+        resource_probe: typing.Optional[ResourceProbe] = None,
         **kwargs
-) -> tuple[float, float]:
-    if init_func:
+) -> BenchmarkResult:
+    """
+    Times `n_tests` calls of `test_func(db, *args, **kwargs)` with `perf_counter_ns`.
+
+    :param setup_func: Untimed `setup_func(db, n=init_func_n)` before every iteration, e.g. to re-seed the data a
+        destructive test removed or changed.
+    :param teardown_func: Untimed `teardown_func(db, n=init_func_n)` after every iteration.
+    :param warmup: Untimed calls made before measuring, e.g. to fill caches and prepare statements.
+    :param disable_gc: Disables the garbage collector while measuring, so collections don't land in a sample.
+    :param resource_probe: Runs one more untimed call after the measurement and stores its resource usage in
+        `BenchmarkResult.resources`, so tracing and counter queries never land in a sample.
+    """
+    init_func_n = None
+    if init_func or setup_func or teardown_func:
         init_func_n = kwargs.pop('init_func_n', kwargs.pop('n', 1000))
+    open_datasets(init_func_n, kwargs.get('n'))
+    if init_func:
         print(f"Applying init function: {init_func.__name__}(n={init_func_n})")
         init_func(db, n=init_func_n)
+    if setup_func:
+        print(f"Applying setup function before every iteration: {setup_func.__name__}(n={init_func_n})")
 
     print(f"Running test function: {test_func.__name__}(*{args}, **{kwargs})")
 
-    timings = []
-    for _ in tqdm(range(n_tests)):
-        timer = Timer(lambda: test_func(db, *args, **kwargs))
-        timings.append(timer.timeit(number=1))
+    call = functools.partial(test_func, db, *args, **kwargs)
+    for _ in range(warmup):
+        if setup_func:
+            setup_func(db, n=init_func_n)
+        call()
+        if teardown_func:
+            teardown_func(db, n=init_func_n)
+
+    samples = array('Q')
+    gc_was_enabled = gc.isenabled()
+    if disable_gc:
+        gc.collect()
+        gc.disable()
+    try:
+        for _ in tqdm(range(n_tests)):
+            if setup_func:
+                setup_func(db, n=init_func_n)
+            start = time.perf_counter_ns()
+            call()
+            samples.append(time.perf_counter_ns() - start)
+            if teardown_func:
+                teardown_func(db, n=init_func_n)
+    finally:
+        if disable_gc and gc_was_enabled:
+            gc.enable()
+
+    result = BenchmarkResult(name=test_func.__name__, samples_ns=samples, warmup=warmup, gc_disabled=disable_gc,
+                             n=init_func_n if init_func_n is not None else kwargs.get('n'), params=dict(kwargs))
+    if resource_probe:
+        if setup_func:
+            setup_func(db, n=init_func_n)
+        result.resources = resource_probe.measure(db, call)
+        if teardown_func:
+            teardown_func(db, n=init_func_n)
+    print(result.summary())
+    return result
+
+
+async def measure_performance_async(
+        db: pymongo.database.Database | psycopg2.extensions.connection,
+        connect: Callable[[], AbstractAsyncContextManager],
+        test_func: Callable[..., Awaitable],
+        n_tests: int,
+        init_func: typing.Optional[Callable] = None,
+        concurrency: int = 1,
+        *args,
+        setup_func: typing.Optional[Callable] = None,
+        warmup: int = 0,
+        disable_gc: bool = False,
+        **kwargs
+) -> BenchmarkResult:
+    """
+    Async counterpart of `measure_performance` that keeps up to `concurrency` operations in flight.
+
+    `init_func` seeds through the synchronous `db`, `test_func` is awaited with the async handle yielded by
+    `connect` (an asyncpg pool or a Motor database). The samples are the per-operation latencies.
+
+    :param setup_func: Untimed `setup_func(db, n=init_func_n)` before every operation, e.g. to re-seed the data a
+        destructive test removed or changed. Operations then can't overlap, so it needs `concurrency=1`.
+    """
+    if setup_func and concurrency != 1:
+        raise ValueError(f"setup_func runs before every operation, it needs concurrency=1, not {concurrency}")
+    init_func_n = None
+    if init_func or setup_func:
+        init_func_n = kwargs.pop('init_func_n', kwargs.pop('n', 1000))
+    open_datasets(init_func_n, kwargs.get('n'))
+    if init_func:
+        print(f"Applying init function: {init_func.__name__}(n={init_func_n})")
+        init_func(db, n=init_func_n)
+    if setup_func:
+        print(f"Applying setup function before every operation: {setup_func.__name__}(n={init_func_n})")
+
+    print(f"Running async test function: {test_func.__name__}(*{args}, **{kwargs}) with {concurrency} in flight")
+
+    samples = array('Q')
+    setup_ns = 0
+    async with connect() as async_db:
+        for _ in range(warmup):
+            if setup_func:
+                setup_func(db, n=init_func_n)
+            await test_func(async_db, *args, **kwargs)
+
+        semaphore = asyncio.Semaphore(concurrency)
+        progress = tqdm(total=n_tests)
+
+        async def run_once() -> None:
+            nonlocal setup_ns
+            async with semaphore:
+                if setup_func:
+                    setup_start = time.perf_counter_ns()
+                    setup_func(db, n=init_func_n)
+                    setup_ns += time.perf_counter_ns() - setup_start
+                start = time.perf_counter_ns()
+                await test_func(async_db, *args, **kwargs)
+                samples.append(time.perf_counter_ns() - start)
+                progress.update()
 
-    avg_time = mean(timings)
-    std_dev = stdev(timings) if len(timings) > 1 else 0
+        gc_was_enabled = gc.isenabled()
+        if disable_gc:
+            gc.collect()
+            gc.disable()
+        try:
+            started = time.perf_counter()
+            await asyncio.gather(*(run_once() for _ in range(n_tests)))
+            # The re-seeding is not part of the throughput either.
+            elapsed = time.perf_counter() - started - setup_ns / 1e9
+        finally:
+            if disable_gc and gc_was_enabled:
+                gc.enable()
+            progress.close()
 
-    print(f"'{test_func.__name__}' - Average time: {avg_time:.4f} s, Std Dev: {std_dev:.4f} s")
-    return avg_time, std_dev
+    result = BenchmarkResult(name=test_func.__name__, samples_ns=samples, warmup=warmup, gc_disabled=disable_gc,
+                             n=init_func_n if init_func_n is not None else kwargs.get('n'),
+                             params={**kwargs, 'concurrency': concurrency})
+    print(f"{result.summary()}, Throughput: {n_tests / elapsed:.1f} ops/s")
+    return result
@@ -5,11 +5,16 @@ from typing import List, Optional, Tuple
 
 import numpy as np
 
+from load_test import LoadResult
+from performance_test import BenchmarkResult
+from streaming_test import StreamingResult
+from scaling import COMPLEXITY_MODELS
+
 PLOT_DIR: Path = Path(__file__).parent / 'plots'
 
 
 def plot_performance_comparison(
-        results_list: List[List[tuple[float, float]]],
+        results_list: List[List[BenchmarkResult]],
         scaling_stages: List[int],
         labels: List[str],
         title: str,
@@ -17,7 +22,7 @@ def plot_performance_comparison(
     """
     Plots the comparison of multiple performance test results with error bars and saves the plot to disk.
 
-    :param results_list: List of lists of tuples of (mean time, std deviation) for each test.
+    :param results_list: List of lists of BenchmarkResult for each test.
     :param scaling_stages: List of stages at which scaling occurs.
     :param labels: List of labels for each test.
     :param title: Title of the plot.
@@ -31,7 +36,8 @@ def plot_performance_comparison(
     bar_width = 0.35 / num_tests
 
     for i, (results, label) in enumerate(zip(results_list, labels)):
-        means, std_devs = zip(*results)
+        means = [result.mean for result in results]
+        std_devs = [result.std for result in results]
         bars = ax.bar(index + i * bar_width, means, yerr=std_devs, width=bar_width, label=label, capsize=5)
         # Annotate bars with their heights
         for bar in bars:
@@ -51,3 +57,110 @@ def plot_performance_comparison(
 
     plt.savefig(PLOT_DIR / f"{title.lower().replace(' ', '_')}.png")
     plt.close()
+
+
+def plot_scaling_curves(
+        results_list: List[List[BenchmarkResult]],
+        fits: List[Tuple[str, float, float]],
+        scaling_stages: List[int],
+        labels: List[str],
+        title: str,
+) -> None:
+    """
+    Plots measured mean and std points for each test next to its fitted complexity curve on log-log axes.
+
+    :param results_list: List of lists of BenchmarkResult, one entry per scaling stage.
+    :param fits: List of tuples of (model name, a, b) for `time = a + b * f(n)`, one per test.
+    :param scaling_stages: List of data sizes that were measured.
+    :param labels: List of labels for each test.
+    :param title: Title of the plot.
+    """
+    fig, ax = plt.subplots(figsize=(12, 6))
+    stages = np.asarray(scaling_stages, dtype=float)
+    curve_n = np.geomspace(stages.min(), stages.max(), 200)
+
+    for results, (model, a, b), label in zip(results_list, fits, labels):
+        means = [result.mean for result in results]
+        std_devs = [result.std for result in results]
+        points = ax.errorbar(stages, means, yerr=std_devs, fmt='o', capsize=5, label=f'{label} (measured)')
+        ax.plot(curve_n, a + b * COMPLEXITY_MODELS[model](curve_n), linestyle='--', color=points[0].get_color(),
+                label=f'{label} fit: {model}')
+
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('Number of rows (n)')
+    ax.set_ylabel('Time Taken (seconds)')
+    ax.set_title(title)
+    ax.legend()
+
+    plt.savefig(PLOT_DIR / f"{title.lower().replace(' ', '_')}.png")
+    plt.close()
+
+
+def plot_load_results(
+        results_list: List[List[LoadResult]],
+        labels: List[str],
+        title: str,
+) -> None:
+    """
+    Plots aggregate throughput and p50/p95/p99 latency per concurrency level and saves the plot to disk.
+
+    :param results_list: List of lists of LoadResult, one per concurrency level, for each test.
+    :param labels: List of labels for each test.
+    :param title: Title of the plot.
+    """
+    fig, (throughput_ax, latency_ax) = plt.subplots(1, 2, figsize=(16, 6))
+
+    for results, label in zip(results_list, labels):
+        clients = [result.clients for result in results]
+        line, = throughput_ax.plot(clients, [result.throughput for result in results], marker='o', label=label)
+        for percentile, style in (('p50', '-'), ('p95', '--'), ('p99', ':')):
+            latency_ax.plot(clients, [getattr(result, percentile) * 1000 for result in results], linestyle=style,
+                            marker='o', color=line.get_color(), label=f'{label} {percentile}')
+
+    for ax in (throughput_ax, latency_ax):
+        ax.set_xscale('log', base=2)
+        ax.set_xlabel('Concurrent clients')
+        ax.legend()
+    throughput_ax.set_ylabel('Throughput (operations / second)')
+    latency_ax.set_ylabel('Latency (milliseconds)')
+    latency_ax.set_yscale('log')
+    fig.suptitle(title)
+
+    plt.savefig(PLOT_DIR / f"{title.lower().replace(' ', '_')}.png")
+    plt.close()
+
+
+def plot_streaming_results(
+        results_list: List[List[StreamingResult]],
+        labels: List[str],
+        title: str,
+) -> None:
+    """
+    Plots time to first row, total time and peak client memory per batch size and saves the plot to disk.
+
+    :param results_list: List of lists of StreamingResult, one per batch size, for each test.
+    :param labels: List of labels for each test.
+    :param title: Title of the plot.
+    """
+    fig, (first_row_ax, total_ax, memory_ax) = plt.subplots(1, 3, figsize=(20, 6))
+
+    for results, label in zip(results_list, labels):
+        batch_sizes = [str(result.batch_size or 'all') for result in results]
+        first_row_ax.plot(batch_sizes, [result.mean_first_row * 1000 for result in results], marker='o', label=label)
+        total_ax.plot(batch_sizes, [result.mean_total for result in results], marker='o', label=label)
+        line, = memory_ax.plot(batch_sizes, [result.max_peak_memory / 2 ** 20 for result in results], marker='o',
+                               label=f'{label} Python objects')
+        memory_ax.plot(batch_sizes, [result.max_peak_rss / 2 ** 20 for result in results], marker='o', linestyle='--',
+                       color=line.get_color(), label=f'{label} RSS growth')
+
+    for ax in (first_row_ax, total_ax, memory_ax):
+        ax.set_xlabel('Batch size')
+        ax.legend()
+    first_row_ax.set_ylabel('Time to first row (milliseconds)')
+    total_ax.set_ylabel('Total time (seconds)')
+    memory_ax.set_ylabel('Peak client memory (MiB)')
+    fig.suptitle(title)
+
+    plt.savefig(PLOT_DIR / f"{title.lower().replace(' ', '_')}.png")
+    plt.close()
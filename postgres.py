@@ -1,43 +1,182 @@
 import functools
-from contextlib import contextmanager
-from typing import Callable, Optional
+import io
+import json
+import random
+from typing import Callable, Iterable, Iterator, Optional
 
-import psycopg2
-from faker import Faker
 from psycopg2.extensions import connection as PgConnection
-from testcontainers.postgres import PostgresContainer
+from psycopg2.extras import Json, execute_values
 
-from performance_test import measure_performance
+from backends import Backend, load_test, performance_test, pool, register_backend, streaming_test
+from dataset import DEFAULT_SEED, load_dataset
+from explain import summarize_postgres_plan
+from load_test import LoadResult
+from resources import ResourceProbe
+from streaming_test import StreamingResult
 
-faker: Faker = Faker()
+
+SONGS_IN_A_PLAYLIST_COLUMNS = """
+            P_Playlists.P_Id,
+            P_Playlists.P_Name,
+            S_Songs.S_Id,
+            S_Songs.S_Title,
+            S_Songs.S_Length,
+            S_Songs.S_Rating,
+            S_Songs.S_YT_Link,
+            A_Artists.A_Id,
+            A_Artists.A_Name,
+            Al_Albums.Al_Id,
+            Al_Albums.Al_Name
+"""
+SONGS_IN_A_PLAYLIST_JOINS = """
+        FROM
+            P_Playlists
+            JOIN P_Playlists_have_S_Songs ON P_Playlists.P_Id = P_Playlists_have_S_Songs.P_Id
+            JOIN S_Songs ON P_Playlists_have_S_Songs.S_Id = S_Songs.S_Id
+            LEFT JOIN Al_Albums ON S_Songs.S_Al_ID = Al_Albums.Al_Id
+            LEFT JOIN Al_Albums_have_A_Artists ON Al_Albums.Al_Id = Al_Albums_have_A_Artists.Al_Id
+            LEFT JOIN A_Artists ON Al_Albums_have_A_Artists.A_Id = A_Artists.A_Id
+"""
+SONGS_IN_A_PLAYLIST_QUERY = f"SELECT {SONGS_IN_A_PLAYLIST_COLUMNS} {SONGS_IN_A_PLAYLIST_JOINS}"
+# Output columns of SongsInAPlaylist, used to read the materialized copies in the same shape.
+SONGS_IN_A_PLAYLIST_FIELDS = "P_Id, P_Name, S_Id, S_Title, S_Length, S_Rating, S_YT_Link, A_Id, A_Name, Al_Id, Al_Name"
+
+# Secondary index configurations for `create_postgres_schema`. The foreign-key columns are the join keys of
+# SongsInAPlaylist, which only has primary key indexes on the referenced side without them.
+INDEX_SETS: dict[str, list[str]] = {
+    'none': [],
+    'fk_btree': [
+        "CREATE INDEX ON P_Playlists_have_S_Songs (P_ID)",
+        "CREATE INDEX ON P_Playlists_have_S_Songs (S_ID)",
+        "CREATE INDEX ON Al_Albums_have_A_Artists (Al_ID)",
+        "CREATE INDEX ON Al_Albums_have_A_Artists (A_ID)",
+        "CREATE INDEX ON S_Songs (S_Al_ID)",
+    ],
+    'fk_composite': [
+        "CREATE INDEX ON P_Playlists_have_S_Songs (P_ID, S_ID)",
+        "CREATE INDEX ON P_Playlists_have_S_Songs (S_ID, P_ID)",
+        "CREATE INDEX ON Al_Albums_have_A_Artists (Al_ID, A_ID)",
+        "CREATE INDEX ON Al_Albums_have_A_Artists (A_ID, Al_ID)",
+        "CREATE INDEX ON S_Songs (S_Al_ID)",
+    ],
+    # Every join can be answered with an index-only scan that carries the selected columns.
+    'covering': [
+        "CREATE INDEX ON P_Playlists_have_S_Songs (P_ID) INCLUDE (S_ID)",
+        "CREATE INDEX ON P_Playlists_have_S_Songs (S_ID) INCLUDE (P_ID)",
+        "CREATE INDEX ON Al_Albums_have_A_Artists (Al_ID) INCLUDE (A_ID)",
+        "CREATE INDEX ON Al_Albums_have_A_Artists (A_ID) INCLUDE (Al_ID)",
+        "CREATE INDEX ON S_Songs (S_ID) INCLUDE (S_Title, S_Length, S_Rating, S_YT_Link, S_Al_ID)",
+        "CREATE INDEX ON S_Songs (S_Al_ID) INCLUDE (S_ID)",
+        "CREATE INDEX ON A_Artists (A_ID) INCLUDE (A_Name)",
+        "CREATE INDEX ON Al_Albums (Al_ID) INCLUDE (Al_Name)",
+        "CREATE INDEX ON P_Playlists (P_ID) INCLUDE (P_Name)",
+    ],
+}
+
+# Per table: query for the S_IDs whose SongsInAPlaylist rows a write to `changed_rows` affects, and the
+# (event, transition table) pairs to react to. Ids never change on the entity tables, so NEW is enough there.
+MATERIALIZED_VIEW_TRIGGERS: dict[str, tuple[str, list[tuple[str, str]]]] = {
+    "P_Playlists_have_S_Songs": (
+        "SELECT DISTINCT S_ID FROM changed_rows",
+        [("INSERT", "NEW"), ("DELETE", "OLD"), ("UPDATE", "OLD"), ("UPDATE", "NEW")],
+    ),
+    "S_Songs": (
+        "SELECT S_ID FROM changed_rows",
+        [("UPDATE", "NEW"), ("DELETE", "OLD")],
+    ),
+    "Al_Albums_have_A_Artists": (
+        "SELECT S_ID FROM S_Songs WHERE S_Al_ID IN (SELECT Al_ID FROM changed_rows)",
+        [("INSERT", "NEW"), ("DELETE", "OLD"), ("UPDATE", "OLD"), ("UPDATE", "NEW")],
+    ),
+    "Al_Albums": (
+        "SELECT S_ID FROM S_Songs WHERE S_Al_ID IN (SELECT Al_ID FROM changed_rows)",
+        [("UPDATE", "NEW")],
+    ),
+    "A_Artists": (
+        "SELECT S_Songs.S_ID FROM S_Songs JOIN Al_Albums_have_A_Artists ON S_Songs.S_Al_ID = Al_Albums_have_A_Artists.Al_ID"
+        " WHERE Al_Albums_have_A_Artists.A_ID IN (SELECT A_ID FROM changed_rows)",
+        [("UPDATE", "NEW")],
+    ),
+    "P_Playlists": (
+        "SELECT S_ID FROM P_Playlists_have_S_Songs WHERE P_ID IN (SELECT P_ID FROM changed_rows)",
+        [("UPDATE", "NEW")],
+    ),
+}
+
+
+def postgres_performance_test(init_func: Optional[Callable] = None, schema: Optional[Callable] = None,
+                              setup_func: Optional[Callable] = None, teardown_func: Optional[Callable] = None,
+                              explain: Optional[str] = None):
+    """
+    `backends.performance_test` on the 'postgres' backend.
+
+    :param explain: Query the decorated function reads with, captured with `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`.
+    """
+    return performance_test('postgres', init_func, schema, setup_func, teardown_func, explain)
+
+
+def explain_postgres_query(connection: PgConnection, query: str) -> dict:
+    """Runs `query` under `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` and summarizes every plan node."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}")
+        plan = cursor.fetchone()[0]
+    connection.rollback()
+    return {'raw': plan, 'summary': summarize_postgres_plan(plan)}
 
 
-def postgres_performance_test(init_func: Optional[Callable] = None):
-    @contextmanager
-    def postgres_context():
-        postgres = PostgresContainer("postgres:latest")
-        postgres.start()
-        db_url = postgres.get_connection_url().replace('postgresql+psycopg2://', 'postgresql://')
-        connection = psycopg2.connect(db_url)
-        create_postgres_schema(connection)
-        try:
-            yield connection
-        finally:
-            connection.close()
-            postgres.stop()
+def postgres_server_counters(connection: PgConnection) -> dict:
+    """Cumulative block and tuple counters of the current database, plus pg_stat_statements totals if loaded."""
+    with connection.cursor() as cursor:
+        if connection.server_version >= 150000:
+            # Statistics are flushed lazily, at most once a second, unless forced at the end of the transaction.
+            cursor.execute("SELECT pg_stat_force_next_flush()")
+            connection.commit()
+        cursor.execute("""SELECT blks_hit, blks_read, tup_returned, tup_fetched, tup_inserted, tup_updated,
+            tup_deleted, temp_files, temp_bytes
+            FROM pg_stat_database WHERE datname = current_database()""")
+        counters = {'database': dict(zip([column.name for column in cursor.description], cursor.fetchone()))}
+        cursor.execute("SELECT current_setting('shared_preload_libraries')")
+        if 'pg_stat_statements' in cursor.fetchone()[0]:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements")
+            cursor.execute("""SELECT COALESCE(SUM(calls), 0), COALESCE(SUM(total_exec_time), 0), COALESCE(SUM(rows), 0),
+                COALESCE(SUM(shared_blks_hit), 0), COALESCE(SUM(shared_blks_read), 0),
+                COALESCE(SUM(temp_blks_written), 0)
+                FROM pg_stat_statements WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())""")
+            counters['statements'] = dict(zip(
+                ('calls', 'total_exec_time_ms', 'rows', 'shared_blks_hit', 'shared_blks_read', 'temp_blks_written'),
+                (float(value) for value in cursor.fetchone())
+            ))
+    connection.commit()
+    return counters
+
+
+def postgres_storage_sizes(connection: PgConnection) -> dict:
+    """Heap (including TOAST) and index bytes of every table and materialized view in the public schema."""
+    with connection.cursor() as cursor:
+        cursor.execute("""SELECT relname, pg_table_size(oid), pg_indexes_size(oid) FROM pg_class
+            WHERE relnamespace = 'public'::regnamespace AND relkind IN ('r', 'm') ORDER BY relname""")
+        sizes = {table: {'table': table_size, 'indexes': index_size} for table, table_size, index_size in cursor}
+    connection.commit()
+    return sizes
+
+
+POSTGRES_RESOURCE_PROBE = ResourceProbe(counters=postgres_server_counters, sizes=postgres_storage_sizes)
 
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, n_tests: int = 10, **kwargs):
-            with postgres_context() as db:
-                return measure_performance(db=db, test_func=func, n_tests=n_tests, init_func=init_func, *args, **kwargs)
 
-        return wrapper
+def postgres_load_test(test_func: Callable, init_func: Optional[Callable] = None, schema: Optional[Callable] = None,
+                       **kwargs) -> list[LoadResult]:
+    """Runs `test_func` with 1..64 concurrent clients, each on its own connection, see `load_test.measure_load`."""
+    return load_test('postgres', test_func, init_func, schema, **kwargs)
 
-    return decorator
 
+def postgres_streaming_test(stream_func: Callable, init_func: Optional[Callable] = None,
+                            schema: Optional[Callable] = None, **kwargs) -> list[StreamingResult]:
+    """Streams the result of `stream_func` at every batch size, see `streaming_test.measure_streaming`."""
+    return streaming_test('postgres', stream_func, init_func, schema, **kwargs)
 
-def create_postgres_schema(conection: PgConnection) -> None:
+
+def create_postgres_schema(conection: PgConnection, index_set: str = 'none') -> None:
+    """:param index_set: Name of the secondary indexes to create from INDEX_SETS, primary keys always exist."""
     with conection.cursor() as cursor:
         cursor.execute("""
           CREATE TABLE A_Artists (
@@ -78,41 +217,179 @@ def create_postgres_schema(conection: PgConnection) -> None:
 
         -- View for Songs in a Playlist
         CREATE VIEW SongsInAPlaylist AS
-        SELECT
-            P_Playlists.P_Id,
-            P_Playlists.P_Name,
-            S_Songs.S_Id,
-            S_Songs.S_Title,
-            S_Songs.S_Length,
-            S_Songs.S_Rating,
-            S_Songs.S_YT_Link,
-            A_Artists.A_Id,
-            A_Artists.A_Name,
-            Al_Albums.Al_Id,
-            Al_Albums.Al_Name
-        FROM
-            P_Playlists
-            JOIN P_Playlists_have_S_Songs ON P_Playlists.P_Id = P_Playlists_have_S_Songs.P_Id
-            JOIN S_Songs ON P_Playlists_have_S_Songs.S_Id = S_Songs.S_Id
-            LEFT JOIN Al_Albums ON S_Songs.S_Al_ID = Al_Albums.Al_Id
-            LEFT JOIN Al_Albums_have_A_Artists ON Al_Albums.Al_Id = Al_Albums_have_A_Artists.Al_Id
-            LEFT JOIN A_Artists ON Al_Albums_have_A_Artists.A_Id = A_Artists.A_Id
+        """ + SONGS_IN_A_PLAYLIST_QUERY + """
         ORDER BY
         P_Playlists.P_Id, S_Songs.S_Id;
         """)
+        for statement in INDEX_SETS[index_set]:
+            cursor.execute(statement)
     conection.commit()
 
 
-def insert_fake_data(connection: PgConnection, n: int) -> None:
+register_backend(Backend(
+    name='postgres',
+    session=pool.postgres,
+    connect=pool.connect_postgres,
+    default_schema=create_postgres_schema,
+    metadata=lambda connection: {'server_version': connection.server_version},
+    resource_probe=POSTGRES_RESOURCE_PROBE,
+    explain=explain_postgres_query,
+))
+
+
+def create_postgres_schema_materialized(connection: PgConnection, mode: str = 'incremental',
+                                        index_set: str = 'none') -> None:
+    """
+    Base schema plus a precomputed copy of SongsInAPlaylist.
+
+    :param mode: 'incremental' keeps the table SongsInAPlaylist_Mat up to date with statement-level triggers that
+        recompute the rows of every song touched by a write. 'concurrent' creates the materialized view
+        SongsInAPlaylist_MV, which has to be brought up to date with `refresh_songs_in_a_playlist` after writes.
+    """
+    create_postgres_schema(connection, index_set)
+    with connection.cursor() as cursor:
+        if mode == 'incremental':
+            cursor.execute(f"""
+            CREATE TABLE SongsInAPlaylist_Mat AS {SONGS_IN_A_PLAYLIST_QUERY} WITH NO DATA;
+            CREATE INDEX SongsInAPlaylist_Mat_P_Id_S_Id ON SongsInAPlaylist_Mat (P_Id, S_Id);
+            CREATE INDEX SongsInAPlaylist_Mat_S_Id ON SongsInAPlaylist_Mat (S_Id);
+
+            CREATE FUNCTION refresh_songs_in_a_playlist_mat(song_ids INTEGER[]) RETURNS void AS $$
+            BEGIN
+                DELETE FROM SongsInAPlaylist_Mat WHERE S_Id = ANY(song_ids);
+                INSERT INTO SongsInAPlaylist_Mat {SONGS_IN_A_PLAYLIST_QUERY} WHERE S_Songs.S_Id = ANY(song_ids);
+            END
+            $$ LANGUAGE plpgsql;
+            """)
+            for table, (affected_songs, events) in MATERIALIZED_VIEW_TRIGGERS.items():
+                cursor.execute(f"""
+                CREATE FUNCTION {table}_refresh_mat() RETURNS trigger AS $$
+                BEGIN
+                    PERFORM refresh_songs_in_a_playlist_mat(ARRAY({affected_songs}));
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql;
+                """)
+                for event, transition in events:
+                    cursor.execute(f"""
+                    CREATE TRIGGER {table}_{event}_{transition}_mat AFTER {event} ON {table}
+                    REFERENCING {transition} TABLE AS changed_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION {table}_refresh_mat();
+                    """)
+        elif mode == 'concurrent':
+            cursor.execute(f"""
+            CREATE MATERIALIZED VIEW SongsInAPlaylist_MV AS
+            SELECT
+                P_Playlists_have_S_Songs.P_S_ID,
+                COALESCE(Al_Albums_have_A_Artists.Al_A_ID, 0) AS Al_A_Key,
+                {SONGS_IN_A_PLAYLIST_COLUMNS}
+            {SONGS_IN_A_PLAYLIST_JOINS};
+            -- REFRESH ... CONCURRENTLY needs a unique index over all rows.
+            CREATE UNIQUE INDEX SongsInAPlaylist_MV_Key ON SongsInAPlaylist_MV (P_S_ID, Al_A_Key);
+            CREATE INDEX SongsInAPlaylist_MV_P_Id_S_Id ON SongsInAPlaylist_MV (P_Id, S_Id);
+            """)
+        else:
+            raise ValueError(f"Unknown materialization mode: {mode}")
+    connection.commit()
+
+
+# JSONB document model mirroring the collections of mongo.py: one (D_ID, Doc) table per collection, references
+# are stored inside the documents as the D_ID of the referenced document.
+DOCUMENT_FIELDS: dict[str, tuple[str, ...]] = {
+    "D_Artists": ("name",),
+    "D_Albums": ("name",),
+    "D_Playlists": ("name",),
+    "D_Songs": ("title", "length", "rating", "yt_link", "artist_id", "album_id"),
+    "D_Artists_Albums": ("artist_id", "album_id"),
+    "D_Songs_Playlists": ("song_id", "playlist_id"),
+}
+
+# Same joins as mongo.SONGS_IN_A_PLAYLIST_PIPELINE, where every $unwind drops unmatched documents.
+SONGS_IN_A_PLAYLIST_DOCUMENT_VIEW = """
+CREATE VIEW SongsInAPlaylist_Doc AS
+SELECT
+    D_Playlists.D_ID AS P_Id,
+    D_Playlists.Doc->>'name' AS P_Name,
+    D_Songs.D_ID AS S_Id,
+    D_Songs.Doc->>'title' AS S_Title,
+    (D_Songs.Doc->>'length')::DECIMAL(5,2) AS S_Length,
+    (D_Songs.Doc->>'rating')::DECIMAL(2,1) AS S_Rating,
+    D_Songs.Doc->>'yt_link' AS S_YT_Link,
+    D_Artists.D_ID AS A_Id,
+    D_Artists.Doc->>'name' AS A_Name,
+    (D_Songs.Doc->>'album_id')::INTEGER AS Al_Id
+FROM
+    D_Songs
+    JOIN D_Songs_Playlists ON (D_Songs_Playlists.Doc->>'song_id')::INTEGER = D_Songs.D_ID
+    JOIN D_Playlists ON D_Playlists.D_ID = (D_Songs_Playlists.Doc->>'playlist_id')::INTEGER
+    JOIN D_Artists_Albums ON (D_Artists_Albums.Doc->>'album_id')::INTEGER = (D_Songs.Doc->>'album_id')::INTEGER
+    JOIN D_Artists ON D_Artists.D_ID = (D_Artists_Albums.Doc->>'artist_id')::INTEGER;
+"""
+
+# Expression indexes take the place of the Mongo indexes on the lookup foreignFields, the GIN indexes answer
+# containment queries (`Doc @> ...`) like a Mongo equality filter on any field.
+DOCUMENT_INDEXES: list[str] = [
+    "CREATE INDEX ON D_Songs_Playlists (((Doc->>'song_id')::INTEGER))",
+    "CREATE INDEX ON D_Artists_Albums (((Doc->>'album_id')::INTEGER))",
+    "CREATE INDEX ON D_Songs (((Doc->>'album_id')::INTEGER))",
+    "CREATE INDEX ON D_Songs USING GIN (Doc jsonb_path_ops)",
+    "CREATE INDEX ON D_Songs_Playlists USING GIN (Doc jsonb_path_ops)",
+]
+
+
+def create_postgres_schema_documents(connection: PgConnection) -> None:
+    """JSONB document tables in the shape of the Mongo collections, see DOCUMENT_FIELDS."""
+    with connection.cursor() as cursor:
+        for table in DOCUMENT_FIELDS:
+            cursor.execute(f"CREATE TABLE {table} (D_ID SERIAL PRIMARY KEY, Doc JSONB NOT NULL)")
+        cursor.execute(SONGS_IN_A_PLAYLIST_DOCUMENT_VIEW)
+        for statement in DOCUMENT_INDEXES:
+            cursor.execute(statement)
+    connection.commit()
+
+
+def refresh_songs_in_a_playlist(connection: PgConnection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY SongsInAPlaylist_MV")
+    connection.commit()
+
+
+def insert_fake_data(connection: PgConnection, n: int, seed: int = DEFAULT_SEED) -> None:
+    """Single-row inserts that pick foreign keys from the ids returned by the inserts of this call."""
+    rng = random.Random(seed)
+    data = load_dataset(n)
+    artist_ids, album_ids, playlist_ids, song_ids = [], [], [], []
+    with connection.cursor() as cursor:
+        for artist_name, album_name, playlist_name, song_title, song_length, song_rating, yt_link in data.rows(
+                n, 'artist_name', 'album_name', 'playlist_name', 'song_title', 'song_length', 'song_rating',
+                'song_yt_link'):
+            cursor.execute("INSERT INTO A_Artists (A_Name) VALUES (%s) RETURNING A_ID", (artist_name,))
+            artist_ids.append(cursor.fetchone()[0])
+            cursor.execute("INSERT INTO Al_Albums (Al_Name) VALUES (%s) RETURNING Al_ID", (album_name,))
+            album_ids.append(cursor.fetchone()[0])
+            cursor.execute("INSERT INTO P_Playlists (P_Name) VALUES (%s) RETURNING P_ID", (playlist_name,))
+            playlist_ids.append(cursor.fetchone()[0])
+            cursor.execute("""INSERT INTO S_Songs (S_Title, S_Length, S_Rating, S_YT_Link, S_Al_ID)
+                VALUES (%s, %s, %s, %s, %s) RETURNING S_ID
+                """, (song_title, song_length, song_rating, yt_link, rng.choice(album_ids)))
+            song_ids.append(cursor.fetchone()[0])
+            cursor.execute("INSERT INTO Al_Albums_have_A_Artists (Al_ID, A_ID) VALUES (%s, %s)",
+                           (rng.choice(album_ids), rng.choice(artist_ids)))
+            cursor.execute("INSERT INTO P_Playlists_have_S_Songs (P_ID, S_ID) VALUES (%s, %s)",
+                           (rng.choice(playlist_ids), rng.choice(song_ids)))
+    connection.commit()
+
+
+def insert_fake_data_random_subquery(connection: PgConnection, n: int) -> None:
+    """Original single-row insert that samples every foreign key with `ORDER BY RANDOM()`, kept for old plots."""
+    data = load_dataset(n)
     with connection.cursor() as cursor:
-        for _ in range(n):
-            cursor.execute("INSERT INTO A_Artists (A_Name) VALUES (%s)", (faker.name(),))
-            cursor.execute("INSERT INTO Al_Albums (Al_Name) VALUES (%s)", (faker.catch_phrase(),))
-            cursor.execute("INSERT INTO P_Playlists (P_Name) VALUES (%s)", (faker.catch_phrase(),))
-            song_title = faker.sentence()
-            song_length = round(faker.pydecimal(left_digits=2, right_digits=2, positive=True), 2)
-            song_rating = round(faker.pydecimal(left_digits=1, right_digits=1, positive=True), 1)
-            yt_link = faker.url()
+        for artist_name, album_name, playlist_name, song_title, song_length, song_rating, yt_link in data.rows(
+                n, 'artist_name', 'album_name', 'playlist_name', 'song_title', 'song_length', 'song_rating',
+                'song_yt_link'):
+            cursor.execute("INSERT INTO A_Artists (A_Name) VALUES (%s)", (artist_name,))
+            cursor.execute("INSERT INTO Al_Albums (Al_Name) VALUES (%s)", (album_name,))
+            cursor.execute("INSERT INTO P_Playlists (P_Name) VALUES (%s)", (playlist_name,))
             cursor.execute("""INSERT INTO S_Songs (S_Title, S_Length, S_Rating, S_YT_Link, S_Al_ID) 
                 VALUES (%s, %s, %s, %s, (SELECT Al_ID FROM Al_Albums ORDER BY RANDOM() LIMIT 1))
                 """, (song_title, song_length, song_rating, yt_link))
@@ -125,33 +402,205 @@ def insert_fake_data(connection: PgConnection, n: int) -> None:
     connection.commit()
 
 
+TABLE_COLUMNS: dict[str, tuple[str, ...]] = {
+    "A_Artists": ("A_Name",),
+    "Al_Albums": ("Al_Name",),
+    "Al_Albums_have_A_Artists": ("Al_ID", "A_ID"),
+    "P_Playlists": ("P_Name",),
+    "S_Songs": ("S_Title", "S_Length", "S_Rating", "S_YT_Link", "S_Al_ID"),
+    "P_Playlists_have_S_Songs": ("P_ID", "S_ID"),
+}
+
+
+def generate_fake_rows(n: int) -> dict[str, Iterator[tuple]]:
+    """Lazily streams the first `n` dataset rows per table, keyed by table name in insertion order."""
+    data = load_dataset(n)
+    return {
+        "A_Artists": data.rows(n, 'artist_name'),
+        "Al_Albums": data.rows(n, 'album_name'),
+        "Al_Albums_have_A_Artists": (
+            (album + 1, artist + 1) for album, artist in data.rows(n, 'album_artist_album', 'album_artist_artist')
+        ),
+        "P_Playlists": data.rows(n, 'playlist_name'),
+        "S_Songs": (
+            (title, length, rating, yt_link, album + 1) for title, length, rating, yt_link, album in
+            data.rows(n, 'song_title', 'song_length', 'song_rating', 'song_yt_link', 'song_album')
+        ),
+        "P_Playlists_have_S_Songs": (
+            (playlist + 1, song + 1) for playlist, song in
+            data.rows(n, 'playlist_song_playlist', 'playlist_song_song')
+        ),
+    }
+
+
 def insert_many_fake_data(connection: PgConnection, n: int) -> None:
     cursor = connection.cursor()
 
-    artists_data = [(faker.name(),) for _ in range(n)]
-    albums_data = [(faker.word(),) for _ in range(n)]
-    playlists_data = [(faker.word(),) for _ in range(n)]
-    songs_data = [
-        (faker.sentence(), faker.random_number(digits=2), faker.random_number(digits=1), faker.url(), i + 1)
-        for i in range(n)
-    ]
-    album_artist_data = [(i + 1, i + 1) for i in range(n)]
-    playlist_song_data = [(i + 1, i + 1) for i in range(n)]
-
-    cursor.executemany("INSERT INTO A_Artists (A_Name) VALUES (%s);", artists_data)
-    cursor.executemany("INSERT INTO Al_Albums (Al_Name) VALUES (%s);", albums_data)
-    cursor.executemany("INSERT INTO Al_Albums_have_A_Artists (Al_ID, A_ID) VALUES (%s, %s);", album_artist_data)
-    cursor.executemany("INSERT INTO P_Playlists (P_Name) VALUES (%s);", playlists_data)
-    cursor.executemany(
-        "INSERT INTO S_Songs (S_Title, S_Length, S_Rating, S_YT_Link, S_Al_ID) VALUES (%s, %s, %s, %s, %s);",
-        songs_data)
-    cursor.executemany("INSERT INTO P_Playlists_have_S_Songs (P_ID, S_ID) VALUES (%s, %s);", playlist_song_data)
+    for table, rows in generate_fake_rows(n).items():
+        columns = TABLE_COLUMNS[table]
+        placeholders = ", ".join(["%s"] * len(columns))
+        cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders});", list(rows))
 
     connection.commit()
     cursor.close()
 
 
-@postgres_performance_test(init_func=insert_many_fake_data)
+def insert_many_fake_data_execute_values(connection: PgConnection, n: int, page_size: int = 1000) -> None:
+    """Like `insert_many_fake_data`, but sends `page_size` rows per multi-row INSERT statement."""
+    with connection.cursor() as cursor:
+        for table, rows in generate_fake_rows(n).items():
+            execute_values(cursor, f"INSERT INTO {table} ({', '.join(TABLE_COLUMNS[table])}) VALUES %s", rows,
+                           page_size=page_size)
+    connection.commit()
+
+
+def copy_fake_data(connection: PgConnection, n: int) -> None:
+    """Streams the generated rows into `COPY ... FROM STDIN` without materializing them on the client."""
+    with connection.cursor() as cursor:
+        for table, rows in generate_fake_rows(n).items():
+            cursor.copy_expert(f"COPY {table} ({', '.join(TABLE_COLUMNS[table])}) FROM STDIN", CopyStream(rows))
+    connection.commit()
+
+
+def reseed_fake_data(connection: PgConnection, n: int) -> None:
+    """Empties all tables, restarts their ids and bulk loads the first `n` dataset rows again via COPY."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {', '.join(TABLE_COLUMNS)} RESTART IDENTITY CASCADE")
+    connection.commit()
+    copy_fake_data(connection, n)
+
+
+class CopyStream(io.TextIOBase):
+    """Read-only file object that renders rows in COPY text format on demand."""
+
+    def __init__(self, rows: Iterable[tuple]):
+        self._lines = ("\t".join(_copy_value(value) for value in row) + "\n" for row in rows)
+        self._buffer = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        while size is None or size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size is None or size < 0:
+            chunk, self._buffer = self._buffer, ""
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def generate_documents(n: int) -> dict[str, Iterator[dict]]:
+    """Lazily streams the first `n` dataset rows as documents per table, keyed by table name in insertion order."""
+    data = load_dataset(n)
+    return {
+        "D_Artists": ({"name": name} for name, in data.rows(n, 'artist_name')),
+        "D_Albums": ({"name": name} for name, in data.rows(n, 'album_name')),
+        "D_Playlists": ({"name": name} for name, in data.rows(n, 'playlist_name')),
+        "D_Songs": (
+            {
+                "title": title,
+                "length": round(float(length), 2),
+                "rating": round(float(rating), 1),
+                "yt_link": yt_link,
+                "artist_id": int(artist) + 1,
+                "album_id": int(album) + 1,
+            }
+            for title, length, rating, yt_link, artist, album in data.rows(
+                n, 'song_title', 'song_length', 'song_rating', 'song_yt_link', 'song_artist', 'song_album')
+        ),
+        "D_Artists_Albums": (
+            {"artist_id": int(artist) + 1, "album_id": int(album) + 1}
+            for album, artist in data.rows(n, 'album_artist_album', 'album_artist_artist')
+        ),
+        "D_Songs_Playlists": (
+            {"song_id": int(song) + 1, "playlist_id": int(playlist) + 1}
+            for playlist, song in data.rows(n, 'playlist_song_playlist', 'playlist_song_song')
+        ),
+    }
+
+
+def insert_document_data(connection: PgConnection, n: int) -> None:
+    """Single-document inserts linking the documents of each row like `mongo.insert_fake_data`."""
+    data = load_dataset(n)
+    with connection.cursor() as cursor:
+        for artist_name, album_name, playlist_name, song_title, song_length, song_rating, yt_link in data.rows(
+                n, 'artist_name', 'album_name', 'playlist_name', 'song_title', 'song_length', 'song_rating',
+                'song_yt_link'):
+            ids = {}
+            for table, document in (("D_Artists", {"name": artist_name}), ("D_Albums", {"name": album_name}),
+                                    ("D_Playlists", {"name": playlist_name})):
+                cursor.execute(f"INSERT INTO {table} (Doc) VALUES (%s) RETURNING D_ID", (Json(document),))
+                ids[table] = cursor.fetchone()[0]
+            cursor.execute("INSERT INTO D_Songs (Doc) VALUES (%s) RETURNING D_ID", (Json({
+                "title": song_title,
+                "length": round(float(song_length), 2),
+                "rating": round(float(song_rating), 1),
+                "yt_link": yt_link,
+                "artist_id": ids["D_Artists"],
+                "album_id": ids["D_Albums"],
+            }),))
+            song_id = cursor.fetchone()[0]
+            cursor.execute("INSERT INTO D_Artists_Albums (Doc) VALUES (%s)",
+                           (Json({"artist_id": ids["D_Artists"], "album_id": ids["D_Albums"]}),))
+            cursor.execute("INSERT INTO D_Songs_Playlists (Doc) VALUES (%s)",
+                           (Json({"song_id": song_id, "playlist_id": ids["D_Playlists"]}),))
+    connection.commit()
+
+
+def insert_many_document_data(connection: PgConnection, n: int) -> None:
+    """One `executemany` per table like `insert_many_fake_data`, so the two compare the data models."""
+    with connection.cursor() as cursor:
+        for table, documents in generate_documents(n).items():
+            cursor.executemany(f"INSERT INTO {table} (Doc) VALUES (%s);", [(Json(doc),) for doc in documents])
+    connection.commit()
+
+
+def copy_document_data(connection: PgConnection, n: int) -> None:
+    """Bulk loads the documents with `COPY ... FROM STDIN`, one JSON text per line."""
+    with connection.cursor() as cursor:
+        for table, documents in generate_documents(n).items():
+            cursor.copy_expert(f"COPY {table} (Doc) FROM STDIN", CopyStream((json.dumps(doc),) for doc in documents))
+    connection.commit()
+
+
+def reseed_document_data(connection: PgConnection, n: int) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {', '.join(DOCUMENT_FIELDS)} RESTART IDENTITY")
+    connection.commit()
+    copy_document_data(connection, n)
+
+
+def stream_songs_in_a_playlist(connection: PgConnection, batch_size: Optional[int]) -> Iterator[tuple]:
+    """
+    Reads SongsInAPlaylist through a named (server-side) cursor that fetches `batch_size` rows per round trip.
+
+    With `batch_size=None` the whole result is fetched at once through a client-side cursor instead.
+    """
+    if batch_size is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT * FROM SongsInAPlaylist")
+            yield from cursor.fetchall()
+        return
+    with connection.cursor(name='stream_songs_in_a_playlist') as cursor:
+        cursor.itersize = batch_size
+        cursor.execute("SELECT * FROM SongsInAPlaylist")
+        yield from cursor
+    # The portal of a named cursor only lives inside a transaction.
+    connection.commit()
+
+
+@postgres_performance_test(init_func=insert_many_fake_data, explain="SELECT * FROM SongsInAPlaylist")
 def test_read_performance(connection: PgConnection) -> None:
     with connection.cursor() as cursor:
         cursor.execute("SELECT * FROM SongsInAPlaylist")
@@ -163,12 +612,65 @@ def test_insert_performance(connection: PgConnection, n: int) -> None:
     insert_fake_data(connection, n)
 
 
+@postgres_performance_test()
+def test_insert_random_subquery_performance(connection: PgConnection, n: int) -> None:
+    insert_fake_data_random_subquery(connection, n)
+
+
 @postgres_performance_test()
 def test_insert_many_performance(connection: PgConnection, n: int) -> None:
     insert_many_fake_data(connection, n)
 
 
-@postgres_performance_test(init_func=insert_many_fake_data)
+@postgres_performance_test()
+def test_insert_execute_values_performance(connection: PgConnection, n: int, page_size: int = 1000) -> None:
+    insert_many_fake_data_execute_values(connection, n, page_size=page_size)
+
+
+@postgres_performance_test()
+def test_insert_copy_performance(connection: PgConnection, n: int) -> None:
+    copy_fake_data(connection, n)
+
+
+@postgres_performance_test(init_func=insert_many_fake_data,
+                           schema=functools.partial(create_postgres_schema_materialized, mode='incremental'),
+                           explain=f"SELECT {SONGS_IN_A_PLAYLIST_FIELDS} FROM SongsInAPlaylist_Mat ORDER BY P_Id, S_Id")
+def test_read_incremental_view_performance(connection: PgConnection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {SONGS_IN_A_PLAYLIST_FIELDS} FROM SongsInAPlaylist_Mat ORDER BY P_Id, S_Id")
+        _ = cursor.fetchall()
+
+
+def insert_many_refresh_fake_data(connection: PgConnection, n: int) -> None:
+    insert_many_fake_data(connection, n)
+    refresh_songs_in_a_playlist(connection)
+
+
+@postgres_performance_test(init_func=insert_many_refresh_fake_data,
+                           schema=functools.partial(create_postgres_schema_materialized, mode='concurrent'),
+                           explain=f"SELECT {SONGS_IN_A_PLAYLIST_FIELDS} FROM SongsInAPlaylist_MV ORDER BY P_Id, S_Id")
+def test_read_materialized_view_performance(connection: PgConnection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {SONGS_IN_A_PLAYLIST_FIELDS} FROM SongsInAPlaylist_MV ORDER BY P_Id, S_Id")
+        _ = cursor.fetchall()
+
+
+@postgres_performance_test(schema=functools.partial(create_postgres_schema_materialized, mode='incremental'))
+def test_insert_incremental_view_performance(connection: PgConnection, n: int) -> None:
+    insert_fake_data(connection, n)
+
+
+@postgres_performance_test(schema=functools.partial(create_postgres_schema_materialized, mode='incremental'))
+def test_insert_many_incremental_view_performance(connection: PgConnection, n: int) -> None:
+    insert_many_fake_data(connection, n)
+
+
+@postgres_performance_test(schema=functools.partial(create_postgres_schema_materialized, mode='concurrent'))
+def test_insert_many_materialized_view_performance(connection: PgConnection, n: int) -> None:
+    insert_many_refresh_fake_data(connection, n)
+
+
+@postgres_performance_test(setup_func=reseed_fake_data)
 def test_delete_performance(connection: PgConnection) -> None:
     with connection.cursor() as cursor:
         cursor.execute("DELETE FROM P_Playlists_have_S_Songs;")
@@ -180,9 +682,86 @@ def test_delete_performance(connection: PgConnection) -> None:
     connection.commit()
 
 
-@postgres_performance_test(init_func=insert_many_fake_data)
+@postgres_performance_test(setup_func=reseed_fake_data)
 def test_update_performance(connection: PgConnection) -> None:
     with connection.cursor() as cursor:
         cursor.execute("UPDATE A_Artists SET A_Name = 'Updated Artist Name';")
         cursor.execute("UPDATE S_Songs SET S_Length = 3.50;")
     connection.commit()
+
+
+@postgres_performance_test(setup_func=reseed_fake_data)
+def test_playlist_push_performance(connection: PgConnection, n_ops: int = 100) -> None:
+    """Adds song i to playlist i for the first `n_ops` ids, one statement each."""
+    with connection.cursor() as cursor:
+        for i in range(1, n_ops + 1):
+            cursor.execute("INSERT INTO P_Playlists_have_S_Songs (P_ID, S_ID) VALUES (%s, %s)", (i, i))
+    connection.commit()
+
+
+@postgres_performance_test(setup_func=reseed_fake_data)
+def test_playlist_pull_performance(connection: PgConnection, n_ops: int = 100) -> None:
+    """Removes the first `n_ops` playlist entries, one statement each."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT P_S_ID FROM P_Playlists_have_S_Songs ORDER BY P_S_ID LIMIT %s", (n_ops,))
+        for p_s_id, in cursor.fetchall():
+            cursor.execute("DELETE FROM P_Playlists_have_S_Songs WHERE P_S_ID = %s", (p_s_id,))
+    connection.commit()
+
+
+@postgres_performance_test(init_func=insert_many_document_data, schema=create_postgres_schema_documents,
+                           explain="SELECT * FROM SongsInAPlaylist_Doc")
+def test_read_document_performance(connection: PgConnection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT * FROM SongsInAPlaylist_Doc")
+        _ = cursor.fetchall()
+
+
+@postgres_performance_test(schema=create_postgres_schema_documents)
+def test_insert_document_performance(connection: PgConnection, n: int) -> None:
+    insert_document_data(connection, n)
+
+
+@postgres_performance_test(schema=create_postgres_schema_documents)
+def test_insert_many_document_performance(connection: PgConnection, n: int) -> None:
+    insert_many_document_data(connection, n)
+
+
+@postgres_performance_test(schema=create_postgres_schema_documents)
+def test_insert_copy_document_performance(connection: PgConnection, n: int) -> None:
+    copy_document_data(connection, n)
+
+
+@postgres_performance_test(setup_func=reseed_document_data, schema=create_postgres_schema_documents)
+def test_delete_document_performance(connection: PgConnection) -> None:
+    with connection.cursor() as cursor:
+        for table in DOCUMENT_FIELDS:
+            cursor.execute(f"DELETE FROM {table};")
+    connection.commit()
+
+
+@postgres_performance_test(setup_func=reseed_document_data, schema=create_postgres_schema_documents)
+def test_update_document_performance(connection: PgConnection) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute("""UPDATE D_Artists SET Doc = jsonb_set(Doc, '{name}', '"Updated Artist Name"');""")
+        cursor.execute("UPDATE D_Songs SET Doc = jsonb_set(Doc, '{length}', '3.50');")
+    connection.commit()
+
+
+@postgres_performance_test(setup_func=reseed_document_data, schema=create_postgres_schema_documents)
+def test_playlist_push_document_performance(connection: PgConnection, n_ops: int = 100) -> None:
+    """Adds song i to playlist i for the first `n_ops` ids, one statement each."""
+    with connection.cursor() as cursor:
+        for i in range(1, n_ops + 1):
+            cursor.execute("INSERT INTO D_Songs_Playlists (Doc) VALUES (%s)", (Json({"song_id": i, "playlist_id": i}),))
+    connection.commit()
+
+
+@postgres_performance_test(setup_func=reseed_document_data, schema=create_postgres_schema_documents)
+def test_playlist_pull_document_performance(connection: PgConnection, n_ops: int = 100) -> None:
+    """Removes the first `n_ops` playlist entries by containment, which goes through the GIN index."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT Doc FROM D_Songs_Playlists ORDER BY D_ID LIMIT %s", (n_ops,))
+        for document, in cursor.fetchall():
+            cursor.execute("DELETE FROM D_Songs_Playlists WHERE Doc @> %s", (Json(document),))
+    connection.commit()
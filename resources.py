@@ -0,0 +1,74 @@
+import resource
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+
+def memory_status(field_name: str) -> int:
+    """`VmRSS` or `VmHWM` of this process in bytes, the lifetime maximum RSS where /proc is not available."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field_name + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def reset_peak_rss() -> None:
+    """Resets `VmHWM` to the current RSS (Linux only), so it only covers what happens from now on."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def counter_deltas(before: dict, after: dict) -> dict:
+    """Per-key difference of two counter snapshots, nested dicts are compared recursively."""
+    deltas = {}
+    for key, value in after.items():
+        if isinstance(value, dict):
+            deltas[key] = counter_deltas(before.get(key, {}), value)
+        elif isinstance(value, (int, float)) and isinstance(before.get(key), (int, float)):
+            deltas[key] = value - before[key]
+    return deltas
+
+
+@dataclass
+class ResourceProbe:
+    """
+    Backend-specific sources of the resource figures stored next to a BenchmarkResult.
+
+    :param counters: Snapshot of cumulative server counters (`counters(db) -> dict`), reported as the delta
+        over one test call.
+    :param sizes: On-disk sizes of the tables or collections and their indexes (`sizes(db) -> dict`), taken
+        after the call.
+    """
+    counters: Optional[Callable[[Any], dict]] = None
+    sizes: Optional[Callable[[Any], dict]] = None
+
+    def measure(self, db, call: Callable[[], Any]) -> dict:
+        """Runs `call` once under tracemalloc and returns the client, server and storage figures of that call."""
+        counters_before = self.counters(db) if self.counters else {}
+        reset_peak_rss()
+        rss_before = memory_status('VmRSS')
+        tracemalloc.start()
+        try:
+            call()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        resources = {
+            'client': {
+                'peak_memory': peak_memory,
+                'peak_rss_growth': max(memory_status('VmHWM') - rss_before, 0),
+                'rss': memory_status('VmRSS'),
+            },
+        }
+        if self.counters:
+            resources['server'] = counter_deltas(counters_before, self.counters(db))
+        if self.sizes:
+            resources['storage'] = self.sizes(db)
+        return resources
@@ -0,0 +1,295 @@
+import argparse
+import dataclasses
+import json
+import math
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import median
+from typing import Optional
+
+from performance_test import BenchmarkResult
+
+RESULTS_DB: Path = Path(os.environ.get('BENCHMARK_RESULTS_DB', Path(__file__).parent / 'results' / 'benchmarks.sqlite'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    git_revision TEXT NOT NULL,
+    environment TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    test_name TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    n INTEGER,
+    params TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    warmup INTEGER NOT NULL,
+    gc_disabled INTEGER NOT NULL,
+    samples_ns BLOB NOT NULL,
+    recorded_at TEXT NOT NULL,
+    resources TEXT NOT NULL DEFAULT '{}',
+    plan TEXT NOT NULL DEFAULT '{}'
+);
+
+CREATE INDEX IF NOT EXISTS results_run_id ON results(run_id);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    job TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    PRIMARY KEY (run_id, job)
+);
+"""
+
+
+def git_revision() -> str:
+    cwd = Path(__file__).parent
+    try:
+        revision = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=cwd, text=True).strip()
+        dirty = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return revision + ('-dirty' if dirty.strip() else '')
+
+
+def environment_metadata() -> dict:
+    import psycopg2
+    import pymongo
+
+    return {
+        'hostname': socket.gethostname(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'psycopg2': psycopg2.__version__,
+        'pymongo': pymongo.version,
+    }
+
+
+def _json(value) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class ResultsStore:
+    """SQLite store of every BenchmarkResult, grouped into runs (one run per process by default)."""
+
+    def __init__(self, path: Path = RESULTS_DB, run_id: Optional[str] = None):
+        self.path = path
+        self.run_id = run_id or os.environ.get('BENCHMARK_RUN_ID') or datetime.now().strftime('%Y%m%dT%H%M%S')
+        self._run_registered = False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(SCHEMA)
+            # Stores created by older versions lack the columns added since.
+            columns = [column for _, column, *_ in connection.execute("PRAGMA table_info(results)")]
+            for added_column in ('resources', 'plan'):
+                if added_column not in columns:
+                    connection.execute(f"ALTER TABLE results ADD COLUMN {added_column} TEXT NOT NULL DEFAULT '{{}}'")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=60)
+
+    def _register_run(self, connection: sqlite3.Connection) -> None:
+        if self._run_registered:
+            return
+        connection.execute(
+            "INSERT OR IGNORE INTO runs (run_id, started_at, git_revision, environment) VALUES (?, ?, ?, ?)",
+            (self.run_id, datetime.now(timezone.utc).isoformat(), git_revision(), _json(environment_metadata())),
+        )
+        self._run_registered = True
+
+    def record(self, result: BenchmarkResult) -> BenchmarkResult:
+        with self._connect() as connection:
+            self._register_run(connection)
+            connection.execute(
+                """INSERT INTO results (run_id, test_name, backend, n, params, metadata, warmup, gc_disabled,
+                                        samples_ns, recorded_at, resources, plan)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (self.run_id, result.name, result.backend, result.n, _json(result.params), _json(result.metadata),
+                 result.warmup, int(result.gc_disabled), result.samples_ns.tobytes(),
+                 datetime.now(timezone.utc).isoformat(), _json(result.resources), _json(result.plan)),
+            )
+        return result
+
+    def load_run(self, run_id: str) -> list[BenchmarkResult]:
+        with self._connect() as connection:
+            rows = connection.execute(
+                """SELECT test_name, backend, n, params, metadata, warmup, gc_disabled, samples_ns, resources, plan
+                FROM results WHERE run_id = ? ORDER BY id""",
+                (run_id,),
+            ).fetchall()
+        results = []
+        for test_name, backend, n, params, metadata, warmup, gc_disabled, samples_ns, resources, plan in rows:
+            samples = array('Q')
+            samples.frombytes(samples_ns)
+            results.append(BenchmarkResult(
+                name=test_name, samples_ns=samples, warmup=warmup, gc_disabled=bool(gc_disabled), backend=backend,
+                n=n, params=json.loads(params), metadata=json.loads(metadata), resources=json.loads(resources),
+                plan=json.loads(plan),
+            ))
+        return results
+
+    def finished_jobs(self) -> set[str]:
+        """Keys of the orchestrator jobs this run already completed, see `orchestrator.Job.key`."""
+        with self._connect() as connection:
+            rows = connection.execute("SELECT job FROM jobs WHERE run_id = ?", (self.run_id,)).fetchall()
+        return {job for job, in rows}
+
+    def mark_job_finished(self, job: str) -> None:
+        with self._connect() as connection:
+            self._register_run(connection)
+            connection.execute(
+                "INSERT OR REPLACE INTO jobs (run_id, job, finished_at) VALUES (?, ?, ?)",
+                (self.run_id, job, datetime.now(timezone.utc).isoformat()),
+            )
+
+    def runs(self) -> list[tuple[str, str, str, int]]:
+        with self._connect() as connection:
+            return connection.execute(
+                """SELECT runs.run_id, started_at, git_revision, COUNT(results.id)
+                FROM runs LEFT JOIN results ON results.run_id = runs.run_id
+                GROUP BY runs.run_id ORDER BY started_at"""
+            ).fetchall()
+
+
+_store: Optional[ResultsStore] = None
+
+
+def record_result(result: BenchmarkResult, backend: str, **metadata) -> BenchmarkResult:
+    """Tags `result` with its backend and persists it in the default store of this process."""
+    global _store
+    if _store is None:
+        _store = ResultsStore()
+    result.backend = backend
+    result.metadata.update(metadata)
+    return _store.record(result)
+
+
+def mann_whitney_u(a: list[int], b: list[int]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test, normal approximation with tie correction."""
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return math.nan
+    combined = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    n = n1 + n2
+    rank_sum_a = 0.0
+    tie_term = 0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        average_rank = (i + j) / 2 + 1
+        rank_sum_a += average_rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        tie_count = j - i + 1
+        tie_term += tie_count ** 3 - tie_count
+        i = j + 1
+
+    u = rank_sum_a - n1 * (n1 + 1) / 2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))) if n > 1 else 0.0
+    if sigma == 0:
+        return 1.0
+    z = (u - n1 * n2 / 2) / sigma
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def _result_key(result: BenchmarkResult) -> tuple:
+    return result.name, result.backend, result.n, _json(result.params)
+
+
+def _pool_by_key(results: list[BenchmarkResult], run_id: str) -> dict[tuple, BenchmarkResult]:
+    """
+    One result per key, with the samples of all results a run recorded under the same key pooled.
+
+    A run can measure the same test, backend, size and params more than once, e.g. when two experiments share a read.
+    """
+    grouped: dict[tuple, list[BenchmarkResult]] = {}
+    for result in results:
+        grouped.setdefault(_result_key(result), []).append(result)
+    pooled = {}
+    for key, group in grouped.items():
+        if len(group) > 1:
+            print(f"Run {run_id} recorded {group[0].name} ({group[0].backend}, n={group[0].n}) {len(group)} times, "
+                  f"pooling their samples")
+            samples = array('Q')
+            for result in group:
+                samples.extend(result.samples_ns)
+            pooled[key] = dataclasses.replace(group[0], samples_ns=samples)
+        else:
+            pooled[key] = group[0]
+    return pooled
+
+
+def compare_runs(baseline_run: str, candidate_run: str, alpha: float = 0.01, threshold: float = 0.05,
+                 store: Optional[ResultsStore] = None) -> list[dict]:
+    """
+    Compares every operation measured in both runs.
+
+    An operation is flagged as a regression (or improvement) when the Mann-Whitney U test rejects equal
+    distributions at `alpha` and the median changed by more than `threshold` (relative).
+    """
+    store = store or ResultsStore()
+    baseline = _pool_by_key(store.load_run(baseline_run), baseline_run)
+    candidate = _pool_by_key(store.load_run(candidate_run), candidate_run)
+
+    comparisons = []
+    for key in sorted(baseline.keys() & candidate.keys(), key=str):
+        old, new = baseline[key], candidate[key]
+        p_value = mann_whitney_u(list(old.samples_ns), list(new.samples_ns))
+        change = new.median / old.median - 1 if old.median else math.nan
+        significant = p_value < alpha and abs(change) > threshold
+        comparisons.append({
+            'test_name': old.name,
+            'backend': old.backend,
+            'n': old.n,
+            'params': old.params,
+            'baseline_median': old.median,
+            'candidate_median': new.median,
+            'change': change,
+            'p_value': p_value,
+            'verdict': ('regression' if change > 0 else 'improvement') if significant else 'unchanged',
+        })
+    return comparisons
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Inspect and compare persisted benchmark runs.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='List all runs in the results store.')
+    compare_parser = subparsers.add_parser('compare', help='Flag significant changes between two runs.')
+    compare_parser.add_argument('baseline_run')
+    compare_parser.add_argument('candidate_run')
+    compare_parser.add_argument('--alpha', type=float, default=0.01, help='Significance level of the U test.')
+    compare_parser.add_argument('--threshold', type=float, default=0.05,
+                                help='Minimum relative change of the median to be reported.')
+    args = parser.parse_args()
+
+    store = ResultsStore()
+    if args.command == 'list':
+        for run_id, started_at, revision, count in store.runs():
+            print(f"{run_id}\t{started_at}\t{revision}\t{count} results")
+        return
+
+    comparisons = compare_runs(args.baseline_run, args.candidate_run, args.alpha, args.threshold, store)
+    for comparison in comparisons:
+        print(f"{comparison['verdict']:>11}  {comparison['backend']:<10} {comparison['test_name']:<40} "
+              f"n={comparison['n']!s:<8} {comparison['baseline_median']:.4f} s -> "
+              f"{comparison['candidate_median']:.4f} s ({comparison['change']:+.1%}, p={comparison['p_value']:.2g})")
+    if any(comparison['verdict'] == 'regression' for comparison in comparisons):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
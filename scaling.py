@@ -0,0 +1,52 @@
+from typing import Callable
+
+import numpy as np
+
+from performance_test import BenchmarkResult
+
+COMPLEXITY_MODELS: dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'O(n)': lambda n: n,
+    'O(n log n)': lambda n: n * np.log2(n),
+    'O(n^2)': lambda n: n ** 2,
+}
+
+
+def _nonnegative_lstsq(design: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Least squares solution of `design @ x = target` with `x >= 0` for a design of two columns.
+
+    With two unknowns the optimum is either the unconstrained solution or lies on one of the axes, so this tries
+    all three instead of needing a general NNLS solver.
+    """
+    candidates = [np.linalg.lstsq(design, target, rcond=None)[0]]
+    for column in range(design.shape[1]):
+        x = np.zeros(design.shape[1])
+        x[column] = max(float(design[:, column] @ target) / max(float(design[:, column] @ design[:, column]),
+                                                                 np.finfo(float).tiny), 0.0)
+        candidates.append(x)
+    feasible = [x for x in candidates if np.all(x >= 0)]
+    return min(feasible, key=lambda x: float(np.sum((design @ x - target) ** 2)))
+
+
+def fit_complexity(results: list[BenchmarkResult], scaling_stages: list[int]) -> tuple[str, float, float]:
+    """
+    Fits `time = a + b * f(n)` with `a, b >= 0` for every model in COMPLEXITY_MODELS and returns the best one.
+
+    Negative coefficients would give curves that can't be drawn on the log-log scaling plot (and make no sense for
+    timings), so they are constrained instead of letting them win the fit.
+
+    :return: Tuple of (model name, a, b) with the lowest relative squared error.
+    """
+    n = np.asarray(scaling_stages, dtype=float)
+    means = np.asarray([result.mean for result in results], dtype=float)
+    best = None
+    for name, model in COMPLEXITY_MODELS.items():
+        design = np.column_stack([np.ones_like(n), model(n)])
+        # Weight by 1/mean so the small stages are not drowned out by the largest one.
+        weights = 1 / np.maximum(means, np.finfo(float).eps)
+        a, b = _nonnegative_lstsq(design * weights[:, None], means * weights)
+        error = float(np.sum(((design @ (a, b) - means) * weights) ** 2))
+        if best is None or error < best[0]:
+            best = (error, name, float(a), float(b))
+    _, name, a, b = best
+    return name, a, b
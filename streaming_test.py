@@ -0,0 +1,105 @@
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from statistics import mean
+from typing import Callable, Iterator, Optional
+
+from resources import memory_status, reset_peak_rss
+
+# None reads the whole result at once, the way the read benchmarks do. It runs last, because memory the
+# allocator keeps after a large run hides the RSS growth of the runs after it.
+STREAMING_BATCH_SIZES: list[Optional[int]] = [100, 1_000, 10_000, None]
+
+
+@dataclass
+class StreamingResult:
+    batch_size: Optional[int]
+    rows: int
+    first_row: list[float] = field(repr=False)
+    total: list[float] = field(repr=False)
+    peak_memory: list[int] = field(repr=False)
+    peak_rss: list[int] = field(repr=False)
+
+    @property
+    def mean_first_row(self) -> float:
+        return mean(self.first_row) if self.first_row else float('nan')
+
+    @property
+    def mean_total(self) -> float:
+        return mean(self.total) if self.total else float('nan')
+
+    @property
+    def max_peak_memory(self) -> int:
+        return max(self.peak_memory, default=0)
+
+    @property
+    def max_peak_rss(self) -> int:
+        return max(self.peak_rss, default=0)
+
+
+def run_stream(
+        db,
+        stream_func: Callable[..., Iterator],
+        batch_size: Optional[int],
+        n_tests: int,
+        *args,
+        **kwargs
+) -> StreamingResult:
+    """
+    Consumes `stream_func(db, batch_size, *args, **kwargs)` `n_tests` times without keeping the rows.
+
+    Peak memory is the tracemalloc peak, i.e. the Python objects the client held at once. Tracing slows down every
+    allocation, so it is measured in one more untimed run, the way `ResourceProbe.measure` does. Buffers the driver
+    allocates outside the Python allocator (e.g. a libpq result) only show up in the peak RSS, which is the growth of
+    the resident set size over its value before a timed run.
+    """
+    first_row, total, peak_rss = [], [], []
+    rows = 0
+    for _ in range(n_tests):
+        reset_peak_rss()
+        rss_before = memory_status('VmRSS')
+        start = time.perf_counter()
+        stream = stream_func(db, batch_size, *args, **kwargs)
+        rows = 0
+        for _ in stream:
+            if not rows:
+                first_row.append(time.perf_counter() - start)
+            rows += 1
+        total.append(time.perf_counter() - start)
+        peak_rss.append(max(memory_status('VmHWM') - rss_before, 0))
+
+    tracemalloc.start()
+    try:
+        for _ in stream_func(db, batch_size, *args, **kwargs):
+            pass
+        peak_memory = [tracemalloc.get_traced_memory()[1]]
+    finally:
+        tracemalloc.stop()
+
+    result = StreamingResult(batch_size=batch_size, rows=rows, first_row=first_row, total=total,
+                             peak_memory=peak_memory, peak_rss=peak_rss)
+    print(f"'{stream_func.__name__}' - batch size {batch_size or 'all'}: {result.rows} rows, "
+          f"first row {result.mean_first_row * 1000:.2f} ms, total {result.mean_total:.4f} s, "
+          f"peak memory {result.max_peak_memory / 2 ** 20:.2f} MiB, peak RSS +{result.max_peak_rss / 2 ** 20:.2f} MiB")
+    return result
+
+
+def measure_streaming(
+        db,
+        stream_func: Callable[..., Iterator],
+        init_func: Optional[Callable] = None,
+        batch_sizes: Optional[list[Optional[int]]] = None,
+        n_tests: int = 5,
+        *args,
+        **kwargs
+) -> list[StreamingResult]:
+    """Seeds `db` once with `init_func` and streams the result of `stream_func` at every batch size."""
+    if init_func:
+        init_func_n = kwargs.pop('init_func_n', kwargs.pop('n', 1000))
+        print(f"Applying init function: {init_func.__name__}(n={init_func_n})")
+        init_func(db, n=init_func_n)
+
+    return [
+        run_stream(db, stream_func, batch_size, n_tests, *args, **kwargs)
+        for batch_size in (batch_sizes or STREAMING_BATCH_SIZES)
+    ]